@@ -0,0 +1,46 @@
+"""
+DXT解码性能测试 - 输出各格式的解码速度（百万像素/秒）
+"""
+
+import sys
+import os
+import time
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.dxt_decoder import decode_dxt1, decode_dxt3, decode_dxt5
+
+
+FORMATS = [
+    ("DXT1", decode_dxt1, 8),
+    ("DXT3", decode_dxt3, 16),
+    ("DXT5", decode_dxt5, 16),
+]
+
+SIZES = [(1024, 1024), (2048, 2048), (3840, 2160)]
+
+
+def bench(decode, block_size, width, height, repeat=3):
+    """返回最佳一次的解码速度（百万像素/秒）"""
+    blocks = ((width + 3) // 4) * ((height + 3) // 4)
+    data = os.urandom(blocks * block_size)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        decode(data, width, height)
+        best = min(best, time.perf_counter() - start)
+    return width * height / best / 1e6
+
+
+def main():
+    """运行所有格式和尺寸的测试"""
+    print("=== DXT解码性能测试 ===")
+    for name, decode, block_size in FORMATS:
+        for width, height in SIZES:
+            mps = bench(decode, block_size, width, height)
+            print(f"{name} {width}x{height}: {mps:8.1f} MP/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ RePKG GUI 重构版 - 主程序入口
 """
 
 import sys
+import multiprocessing
 from PyQt6.QtWidgets import QApplication
 from ui.main_window import RePKGGUI
 
@@ -19,4 +20,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # 批量提取的工作进程在打包后的程序中也能启动
+    multiprocessing.freeze_support()
     main()
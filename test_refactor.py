@@ -4,6 +4,8 @@
 
 import sys
 import os
+import struct
+import tempfile
 
 # 添加当前目录到Python路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -14,7 +16,7 @@ def test_imports():
         from utils.config_manager import ConfigManager
         from utils.file_operations import FileOperations
         from utils.version_checker import VersionChecker
-        from utils.workers import ExtractWorker, ImageLoadWorker
+        from utils.workers import ExtractWorker, PkgExtractWorker, ImageLoadWorker
         from ui.tabs import TabCreator
         from ui.main_window import RePKGGUI
         print("✓ 所有模块导入成功")
@@ -59,6 +61,791 @@ def test_version_checker():
         print(f"✗ 版本检查器测试失败: {e}")
         return False
 
+def build_test_pkg(entries, magic="PKGV0019"):
+    """构造测试用PKG文件内容，entries为(名称, 字节)列表"""
+    def pack_string(text):
+        raw = text.encode("utf-8")
+        return struct.pack("<i", len(raw)) + raw
+
+    header = pack_string(magic) + struct.pack("<i", len(entries))
+    data = b""
+    for name, content in entries:
+        header += pack_string(name) + struct.pack("<ii", len(data), len(content))
+        data += content
+    return header + data
+
+def test_pkg_reader():
+    """测试内置PKG解析器"""
+    try:
+        from utils.pkg_reader import PkgReader
+        from utils.file_operations import FileOperations
+        with tempfile.TemporaryDirectory() as tmp:
+            pkg_path = os.path.join(tmp, "scene.pkg")
+            with open(pkg_path, "wb") as f:
+                f.write(build_test_pkg([("scene.json", b"{}"), ("materials/a.png", b"PNGDATA")]))
+
+            with PkgReader(pkg_path) as reader:
+                assert reader.magic == "PKGV0019"
+                assert reader.entry_names() == ["scene.json", "materials/a.png"]
+                view = reader.read("materials/a.png")
+                assert bytes(view) == b"PNGDATA"
+                view.release()
+
+            out_dir = os.path.join(tmp, "out")
+            FileOperations.extract_pkg(pkg_path, out_dir)
+            with open(os.path.join(out_dir, "materials", "a.png"), "rb") as f:
+                assert f.read() == b"PNGDATA"
+        print("✓ PKG解析器工作正常")
+        return True
+    except Exception as e:
+        print(f"✗ PKG解析器测试失败: {e!r}")
+        return False
+
+def build_test_tex(width, height, payload, tex_format=0, lz4_payload=None, extra_mipmaps=()):
+    """构造测试用TEX文件内容（TEXB0003，单帧），extra_mipmaps为(宽, 高, 字节)列表"""
+    header = b"TEXV0005\0TEXI0001\0"
+    header += struct.pack("<7i", tex_format, 0, width, height, width, height, 0)
+    header += b"TEXB0003\0" + struct.pack("<ii", 1, -1)
+    mipmap_data = lz4_payload if lz4_payload is not None else payload
+    mipmaps = struct.pack("<iiiiii", 1 + len(extra_mipmaps), width, height,
+                          1 if lz4_payload is not None else 0, len(payload), len(mipmap_data))
+    mipmaps += mipmap_data
+    for mip_width, mip_height, mip_data in extra_mipmaps:
+        mipmaps += struct.pack("<iiiii", mip_width, mip_height, 0, len(mip_data), len(mip_data))
+        mipmaps += mip_data
+    return header + mipmaps
+
+def build_test_video_tex(video):
+    """构造测试用视频纹理（TEXB0004，内嵌MP4）"""
+    header = b"TEXV0005\0TEXI0001\0"
+    header += struct.pack("<7i", 0, 0, 16, 16, 16, 16, 0)
+    header += b"TEXB0004\0" + struct.pack("<iii", 1, -1, 1)
+    mipmaps = struct.pack("<iii", 1, 0, 0) + b"\0" + struct.pack("<i", 0)
+    mipmaps += struct.pack("<iiiii", 16, 16, 0, len(video), len(video)) + video
+    return header + mipmaps
+
+def test_tex_decoder():
+    """测试TEX纹理解码"""
+    try:
+        from utils import tex_decoder
+        from utils.tex_decoder import TexFile, convert_tex
+        pixels = bytes([255, 0, 0, 255]) * 4
+        # 仅包含字面量的LZ4块：token高4位15 + 额外长度1 = 16字节
+        lz4_payload = bytes([0xF0, 1]) + pixels
+        tex = TexFile(build_test_tex(2, 2, pixels, lz4_payload=lz4_payload))
+        assert (tex.texture_width, tex.texture_height) == (2, 2)
+        assert tex.decode_rgba() == (2, 2, pixels)
+
+        # 无lz4库时使用纯Python解压
+        saved = tex_decoder.lz4_block
+        tex_decoder.lz4_block = None
+        try:
+            assert tex.decode_rgba() == (2, 2, pixels)
+        finally:
+            tex_decoder.lz4_block = saved
+
+        ext, png = convert_tex(build_test_tex(2, 2, pixels))
+        assert ext == ".png" and png.startswith(b"\x89PNG")
+        print("✓ TEX纹理解码工作正常")
+        return True
+    except Exception as e:
+        print(f"✗ TEX纹理解码测试失败: {e!r}")
+        return False
+
+def test_dxt_decoder():
+    """测试DXT纹理解码"""
+    try:
+        from utils.tex_decoder import TexFile
+        # 单个DXT1块：c0=纯红，c1=纯蓝，索引全为1（取c1）
+        block = struct.pack("<HHI", 0xF800, 0x001F, 0x55555555)
+        tex = TexFile(build_test_tex(4, 4, block, tex_format=7))
+        width, height, rgba = tex.decode_rgba()
+        assert (width, height) == (4, 4)
+        assert rgba == bytes([0, 0, 255, 255]) * 16
+
+        # DXT5：透明度端点255/0，索引全为0
+        alpha = bytes([255, 0]) + bytes(6)
+        tex = TexFile(build_test_tex(4, 4, alpha + block, tex_format=4))
+        assert tex.decode_rgba()[2] == bytes([0, 0, 255, 255]) * 16
+        print("✓ DXT纹理解码工作正常")
+        return True
+    except Exception as e:
+        print(f"✗ DXT纹理解码测试失败: {e!r}")
+        return False
+
+def test_pkg_thumbnail():
+    """测试从scene.pkg生成缩略图"""
+    try:
+        from utils.thumbnails import load_pkg_thumbnail
+        red = bytes([255, 0, 0, 255])
+        blue = bytes([0, 0, 255, 255])
+        small = build_test_tex(8, 8, red * 64)
+        # 最大纹理：512x512，mipmap依次为512、256、128；缩略图应取256级（蓝色）
+        large = build_test_tex(512, 512, red * 512 * 512,
+                               extra_mipmaps=[(256, 256, blue * 256 * 256), (128, 128, red * 128 * 128)])
+        with tempfile.TemporaryDirectory() as tmp:
+            pkg_path = os.path.join(tmp, "scene.pkg")
+            with open(pkg_path, "wb") as f:
+                f.write(build_test_pkg([("materials/small.tex", small), ("materials/large.tex", large)]))
+            image = load_pkg_thumbnail(pkg_path, 180)
+            assert image is not None and (image.width(), image.height()) == (180, 180)
+            color = image.pixelColor(90, 90)
+            assert (color.red(), color.blue()) == (0, 255)
+        print("✓ PKG缩略图生成正常")
+        return True
+    except Exception as e:
+        print(f"✗ PKG缩略图测试失败: {e!r}")
+        return False
+
+def test_library_index():
+    """测试壁纸库增量索引"""
+    try:
+        import json
+        from utils import library_index
+        from utils.library_index import LibraryIndex
+        with tempfile.TemporaryDirectory() as tmp:
+            workshop = os.path.join(tmp, "431960")
+            for workshop_id, title in (("1001", "Alpha"), ("1002", "Beta")):
+                item_dir = os.path.join(workshop, workshop_id)
+                os.makedirs(item_dir)
+                with open(os.path.join(item_dir, "project.json"), "w", encoding="utf-8") as f:
+                    json.dump({"title": title, "type": "Scene", "tags": ["Anime"]}, f)
+                open(os.path.join(item_dir, "preview.jpg"), "wb").close()
+            # 子目录中的文件也计入大小
+            os.makedirs(os.path.join(workshop, "1001", "materials", "sub"))
+            with open(os.path.join(workshop, "1001", "materials", "sub", "a.png"), "wb") as f:
+                f.write(b"x" * 1000)
+            json_size = os.path.getsize(os.path.join(workshop, "1001", "project.json"))
+
+            index = LibraryIndex(os.path.join(tmp, "library.db"))
+            records = {r["workshop_id"]: r for r in index.scan(workshop)}
+            assert records["1001"]["title"] == "Alpha" and records["1001"]["type"] == "scene"
+            assert records["1001"]["file_size"] == json_size + 1000
+            assert records["1002"]["tags"] == ["Anime"]
+
+            # 只修改1002：重新扫描时只应读取这一个目录
+            with open(os.path.join(workshop, "1002", "project.json"), "w", encoding="utf-8") as f:
+                json.dump({"title": "Gamma"}, f)
+            stat = os.stat(os.path.join(workshop, "1002"))
+            os.utime(os.path.join(workshop, "1002"), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+            reads = []
+            original = library_index.read_item_directory
+            library_index.read_item_directory = lambda path, *a: reads.append(path) or original(path, *a)
+            try:
+                records = {r["workshop_id"]: r for r in index.scan(workshop)}
+            finally:
+                library_index.read_item_directory = original
+            assert reads == [os.path.join(workshop, "1002")]
+            assert records["1002"]["title"] == "Gamma" and records["1001"]["title"] == "Alpha"
+        print("✓ 壁纸库索引工作正常")
+        return True
+    except Exception as e:
+        print(f"✗ 壁纸库索引测试失败: {e!r}")
+        return False
+
+def test_thumbnail_cache():
+    """测试缩略图磁盘缓存"""
+    try:
+        import time
+        from utils.thumbnail_cache import ThumbnailDiskCache
+        with tempfile.TemporaryDirectory() as tmp:
+            sources = []
+            for i in range(3):
+                path = os.path.join(tmp, f"preview{i}.jpg")
+                with open(path, "wb") as f:
+                    f.write(b"x" * (i + 1))
+                sources.append(path)
+
+            cache = ThumbnailDiskCache(os.path.join(tmp, "cache"), max_bytes=2500)
+            cache.put(sources[0], 180, b"a" * 1000)
+            time.sleep(0.01)
+            cache.put(sources[1], 180, b"b" * 1000)
+            time.sleep(0.01)
+            assert cache.get(sources[0], 180) == b"a" * 1000  # 刷新0的使用时间
+            assert cache.get(sources[0], 280) is None
+            time.sleep(0.01)
+            cache.put(sources[2], 180, b"c" * 1000)  # 超出容量，淘汰最久未用的1
+            assert cache.get(sources[1], 180) is None
+            assert cache.get(sources[0], 180) is not None and cache.get(sources[2], 180) is not None
+
+            # 覆盖已有条目时不重复计入大小；写入失败时不留下临时文件
+            cache.put(sources[2], 180, b"c" * 1000)
+            assert cache._total_bytes == 2000
+            blocked = ThumbnailDiskCache(os.path.join(tmp, "blocked"), max_bytes=2500)
+            blocked.put(sources[0], 180, b"a")
+            entry_path = blocked._entry_path(blocked.make_key(sources[0], 180))
+            os.remove(entry_path)
+            os.makedirs(entry_path)  # 目标是目录，os.replace失败
+            blocked.put(sources[0], 180, b"a")
+            assert os.listdir(os.path.dirname(entry_path)) == [os.path.basename(entry_path)]
+
+            # 降低上限只修改设置，trim()时才淘汰
+            time.sleep(0.01)
+            cache.get(sources[2], 180)
+            cache.set_max_bytes(1500)
+            assert cache.get(sources[0], 180) is not None
+            time.sleep(0.01)
+            cache.get(sources[2], 180)
+            cache.trim()
+            assert cache.get(sources[0], 180) is None and cache.get(sources[2], 180) is not None
+
+            # 源文件变化后缓存失效
+            with open(sources[0], "wb") as f:
+                f.write(b"changed")
+            assert cache.get(sources[0], 180) is None
+
+        # 内存缓存：超出上限时淘汰最久未使用的条目
+        from PyQt6.QtGui import QImage
+        from utils.thumbnail_cache import ThumbnailMemoryCache
+        image = QImage(10, 10, QImage.Format.Format_ARGB32)  # 400字节
+        memory_cache = ThumbnailMemoryCache(max_bytes=1000)
+        memory_cache.put("a", 180, image)
+        memory_cache.put("b", 180, image)
+        assert memory_cache.get("a", 180) is not None
+        memory_cache.put("c", 180, image)
+        assert ("b", 180) not in memory_cache and ("a", 180) in memory_cache
+        print("✓ 缩略图缓存工作正常")
+        return True
+    except Exception as e:
+        print(f"✗ 缩略图缓存测试失败: {e!r}")
+        return False
+
+def test_wallpaper_model():
+    """测试虚拟化壁纸列表模型"""
+    try:
+        from ui.wallpaper_grid import WallpaperListModel, PathRole
+        model = WallpaperListModel()
+        model.append_paths(["/w/1/preview.jpg", "/w/2/preview.gif"])
+        model.append_paths(["/w/3/scene.pkg"])
+        assert model.rowCount() == 3
+        assert model.index(2).data(PathRole) == "/w/3/scene.pkg"
+
+        # 替换列表后，旧代号的加载结果被丢弃
+        old_generation = model.generation
+        model.set_paths(["/w/4/preview.jpg"])
+        assert model.rowCount() == 1 and model.generation == old_generation + 1
+        model.scheduler._on_image_loaded(old_generation, 0, "/w/4/preview.jpg", None)
+        assert not model.is_failed(0)
+        model.scheduler._on_image_loaded(model.generation, 0, "/w/4/preview.jpg", None)
+        assert model.is_failed(0)
+
+        # 调度器：可见 > 选中 > 预取 > 空闲，移出窗口的请求被丢弃
+        from utils import workers
+        from utils.workers import (ThumbnailScheduler, PRIORITY_VISIBLE, PRIORITY_SELECTED,
+                                   PRIORITY_PREFETCH, PRIORITY_IDLE)
+        started = []
+
+        class FakeSignal:
+            def __init__(self):
+                self.connected = False
+            def connect(self, slot):
+                self.connected = True
+            def disconnect(self):
+                # 与PyQt6一致：没有连接时disconnect()抛出TypeError
+                if not self.connected:
+                    raise TypeError("disconnect() failed")
+                self.connected = False
+
+        class FakeLoader:
+            running = False
+            def __init__(self, items, *args):
+                self.imageLoaded = FakeSignal()
+                started.extend(path for _, path in items)
+            def start(self):
+                pass
+            def cancel(self):
+                pass
+            def isRunning(self):
+                return FakeLoader.running
+
+        original = workers.ImageLoadWorker
+        workers.ImageLoadWorker = FakeLoader
+        try:
+            scheduler = ThumbnailScheduler(max_in_flight=1)
+            scheduler.request(0, "busy", PRIORITY_IDLE)  # 占用唯一的名额
+            scheduler.set_window([(1, "idle", PRIORITY_IDLE), (2, "prefetch", PRIORITY_PREFETCH),
+                                  (3, "dropped", PRIORITY_IDLE), (4, "visible", PRIORITY_VISIBLE)])
+            scheduler.request(5, "selected", PRIORITY_SELECTED)
+            scheduler.set_window([(1, "idle", PRIORITY_IDLE), (2, "prefetch", PRIORITY_PREFETCH),
+                                  (4, "visible", PRIORITY_VISIBLE), (5, "selected", PRIORITY_SELECTED)])
+            scheduler.request(2, "prefetch", PRIORITY_VISIBLE)  # 提升优先级，排在同级的visible之后
+            for row, path in ((0, "busy"), (4, "visible"), (2, "prefetch"), (5, "selected")):
+                scheduler._on_image_loaded(scheduler.generation, row, path, None)
+
+            # 加载器仍在运行时连续reset()（例如连续输入搜索）不能重复断开信号
+            FakeLoader.running = True
+            busy = ThumbnailScheduler(max_in_flight=1)
+            busy.request(0, "slow", PRIORITY_VISIBLE)
+            busy.reset()
+            busy.reset()
+            busy.request(0, "next", PRIORITY_VISIBLE)
+            busy.reset()
+            assert len(busy._retired) == 2 and not busy._loaders
+        finally:
+            workers.ImageLoadWorker = original
+        assert started[:5] == ["busy", "visible", "prefetch", "selected", "idle"], started
+        print("✓ 壁纸列表模型工作正常")
+        return True
+    except Exception as e:
+        print(f"✗ 壁纸列表模型测试失败: {e!r}")
+        return False
+
+def test_search_index():
+    """测试多字段相关度搜索"""
+    try:
+        from utils.search_index import SearchIndex, edit_distance
+        index = SearchIndex([
+            ("a", {"workshop_id": "1001", "title": "Sunset Beach", "type": "video",
+                   "tags": ["Nature"], "description": "Waves at night"}),
+            ("b", {"workshop_id": "1002", "title": "Cyber City Night", "type": "scene",
+                   "tags": ["Sci-Fi"]}),
+            ("c", {"workshop_id": "2001", "title": "abcxbcd", "type": "web"}),
+            ("d", {"workshop_id": "2002", "title": "Night  Sky", "type": "scene",
+                   "tags": ["Nature"]}),
+        ])
+        # 标题命中排在简介命中之前，同分保持原顺序
+        assert index.search("night") == ["b", "d", "a"]
+        assert index.search("NIGHT sky") == ["d"]  # 多个查询词同时匹配
+        assert index.search("abcd") == []  # 三元组都存在但不连续
+        assert index.search("bea") == ["a"]  # 前缀
+        assert index.search("ity") == ["b"]  # 子串
+        assert index.search("natur") == ["a", "d"]  # 标签
+        assert index.search("scene") == ["b", "d"]  # 类型
+        assert index.search("2001") == ["c"] and index.search("100") == ["a", "b"]  # 创意工坊ID
+        assert index.search("nihgt sky") == ["d"]  # 容错
+        assert index.search("sunst") == ["a"]
+        assert index.search("  ") == ["a", "b", "c", "d"]
+        assert index.search("xyz") == []
+        assert edit_distance("kitten", "sitting", 3) == 3 and edit_distance("abc", "xyz", 1) == 2
+        print("✓ 搜索索引工作正常")
+        return True
+    except Exception as e:
+        print(f"✗ 搜索索引测试失败: {e!r}")
+        return False
+
+def test_metadata_cache():
+    """测试project.json元数据缓存"""
+    try:
+        import json
+        import types
+        from utils import metadata as metadata_module
+        from utils.metadata import MetadataCache
+        with tempfile.TemporaryDirectory() as tmp:
+            item_dirs = []
+            for i in range(3):
+                item_dir = os.path.join(tmp, str(1000 + i))
+                os.makedirs(item_dir)
+                with open(os.path.join(item_dir, "project.json"), "w", encoding="utf-8") as f:
+                    json.dump({"title": f"Item {i}", "type": "Video", "tags": ["Anime"],
+                               "contentrating": "Everyone"}, f)
+                item_dirs.append(item_dir)
+            os.makedirs(os.path.join(tmp, "empty"))
+
+            parses = []
+            original = metadata_module.json
+            metadata_module.json = types.SimpleNamespace(load=lambda f: parses.append(1) or json.load(f))
+            try:
+                cache = MetadataCache()
+                loaded = cache.load_many(item_dirs + [os.path.join(tmp, "empty")])
+                assert len(loaded) == 3 and len(parses) == 3
+                record = cache.get(item_dirs[0])
+                assert record.title == "Item 0" and record.type == "video"
+                assert record.tags == ["Anime"] and record.content_rating == "Everyone"
+                assert len(parses) == 3  # 命中缓存，不再解析
+
+                # 文件变化后重新解析
+                with open(os.path.join(item_dirs[0], "project.json"), "w", encoding="utf-8") as f:
+                    json.dump({"title": "Renamed wallpaper"}, f)
+                assert cache.get(item_dirs[0]).title == "Renamed wallpaper" and len(parses) == 4
+                assert cache.get(os.path.join(tmp, "empty")) is None
+
+                # 启动时由壁纸库索引的记录填充共享缓存，不再读取project.json
+                from utils.library_index import LibraryIndex
+                from utils.workers import MetadataLoadWorker
+                records = LibraryIndex(os.path.join(tmp, "library.db")).scan(tmp)
+                shared = metadata_module.get_metadata_cache()
+                shared.clear()
+                del parses[:]
+                records = LibraryIndex(os.path.join(tmp, "library.db")).scan(tmp)  # 全部来自数据库
+                MetadataLoadWorker(records).run()
+                assert shared.get(item_dirs[1]).title == "Item 1" and shared.get(item_dirs[1]).tags == ["Anime"]
+                assert shared.get(item_dirs[0]).title == "Renamed wallpaper"
+                assert not parses
+                # 记录之后project.json被原地修改（目录修改时间不变）时，按文件的修改时间和大小发现并重新解析
+                with open(os.path.join(item_dirs[1], "project.json"), "w", encoding="utf-8") as f:
+                    json.dump({"title": "Changed in place"}, f)
+                assert shared.get(item_dirs[1]).title == "Changed in place" and len(parses) == 1
+                shared.clear()
+            finally:
+                metadata_module.json = original
+        print("✓ 元数据缓存工作正常")
+        return True
+    except Exception as e:
+        print(f"✗ 元数据缓存测试失败: {e!r}")
+        return False
+
+def test_facets():
+    """测试分面筛选索引"""
+    try:
+        from utils.facets import FacetIndex
+        MB = 1024 * 1024
+        records = [
+            {"preview": "a", "type": "scene", "content_rating": "Everyone", "tags": ["Anime"],
+             "has_scene_pkg": True, "has_mp4": False, "file_size": 5 * MB},
+            {"preview": "b", "type": "video", "content_rating": "Mature", "tags": ["Anime", "Game"],
+             "has_scene_pkg": False, "has_mp4": True, "file_size": 300 * MB},
+            {"preview": "c", "type": "video", "content_rating": "Everyone", "tags": [],
+             "has_scene_pkg": False, "has_mp4": True, "file_size": 50 * MB},
+        ]
+        index = FacetIndex(records)
+        assert index.values("type") == ["scene", "video"]
+        assert index.values("size") == ["< 10 MB", "10 - 100 MB", "100 - 500 MB"]
+        assert index.filter({"type": {"video"}}) == ["b", "c"]
+        assert index.filter({"type": {"video"}, "content_rating": {"Everyone"}}) == ["c"]
+        assert index.filter({"tags": {"Anime", "Game"}}) == ["a", "b"]  # 同一分面内取"或"
+        assert index.filter({"contents": {"scene.pkg"}}) == ["a"]
+        assert index.filter({"size": {"100 - 500 MB"}, "tags": {"Anime"}}) == ["b"]
+        assert index.filter({"type": set()}) == ["a", "b", "c"]
+        assert index.filter({"type": {"video"}}, ["c", "a", "b"]) == ["c", "b"]  # 保持搜索结果顺序
+        assert index.counts("type", {"type": {"scene"}, "tags": {"Anime"}}) == {"scene": 1, "video": 1}
+        print("✓ 分面筛选工作正常")
+        return True
+    except Exception as e:
+        print(f"✗ 分面筛选测试失败: {e!r}")
+        return False
+
+def test_sort_index():
+    """测试预排序索引"""
+    try:
+        import numpy as np
+        from utils.sort_index import SortIndex
+        records = [
+            {"preview": "a", "workshop_id": "30", "title": "beta", "created_ns": 3, "mtime_ns": 10, "file_size": 200},
+            {"preview": "b", "workshop_id": "100", "title": "Alpha", "created_ns": 1, "mtime_ns": 30, "file_size": 200},
+            {"preview": "c", "workshop_id": "2", "title": "gamma", "created_ns": 2, "mtime_ns": 20, "file_size": 50},
+        ]
+        index = SortIndex(records)
+        assert index.sorted_keys("title") == ["b", "a", "c"]  # 不区分大小写
+        assert index.sorted_keys("workshop_id") == ["c", "a", "b"]  # 按数值而非字符串
+        assert index.sorted_keys("created") == ["b", "c", "a"]
+        assert index.sorted_keys("modified", descending=True) == ["b", "c", "a"]
+        assert index.sorted_keys("size") == ["c", "a", "b"]  # 同值按ID
+        assert index.sorted_keys("title", mask=np.array([True, False, True])) == ["a", "c"]
+        assert index.sort(["c", "x", "b"], "title") == ["b", "c", "x"]  # 未知的键排在最后
+        assert index.sort(["c", "x", "b"], "title", descending=True) == ["c", "b", "x"]
+        print("✓ 预排序索引工作正常")
+        return True
+    except Exception as e:
+        print(f"✗ 预排序索引测试失败: {e!r}")
+        return False
+
+def test_batch_extract():
+    """测试批量提取引擎"""
+    try:
+        from utils.batch_extract import find_batch_items, BatchExtractor
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "workshop")
+            out = os.path.join(tmp, "out")
+            pkg = build_test_pkg([("materials/a.tex", build_test_tex(4, 4, bytes(range(64)))),
+                                  ("scene.json", b"{}")])
+            for i in range(3):
+                item_dir = os.path.join(src, str(100 + i))
+                os.makedirs(os.path.join(item_dir, "sub"))
+                with open(os.path.join(item_dir, "scene.pkg"), "wb") as f:
+                    f.write(pkg)
+                # 已找到壁纸的目录不再进入子目录
+                with open(os.path.join(item_dir, "sub", "x.mp4"), "wb") as f:
+                    f.write(b"0")
+            video_dir = os.path.join(src, "200")
+            os.makedirs(video_dir)
+            with open(os.path.join(video_dir, "v.mp4"), "wb") as f:
+                f.write(b"video")
+
+            items = find_batch_items(src, out)
+            assert [os.path.basename(item.save_dir) for item in items] == ["100", "101", "102", "200"]
+            assert items[0].size == len(pkg)
+
+            bad_dir = os.path.join(src, "300")
+            os.makedirs(bad_dir)
+            with open(os.path.join(bad_dir, "scene.pkg"), "wb") as f:
+                f.write(b"not a pkg")
+            items = find_batch_items(src, out)
+
+            updates = []
+            progress = BatchExtractor(items, max_workers=2).run(lambda p: updates.append(p.done))
+            assert progress.done == 5 and progress.failed == 1
+            assert updates == [1, 2, 3, 4, 5]
+            assert progress.bytes_done == sum(item.size for item in items)
+            assert progress.items_per_second > 0 and progress.mb_per_second > 0
+            for i in range(3):
+                assert os.path.exists(os.path.join(out, str(100 + i), "materials", "a.png"))
+            assert os.path.exists(os.path.join(out, "200", "v.mp4"))
+        print("✓ 批量提取引擎工作正常")
+        return True
+    except Exception as e:
+        print(f"✗ 批量提取引擎测试失败: {e!r}")
+        return False
+
+def test_entry_filter():
+    """测试按条目表筛选的选择性提取"""
+    try:
+        from utils.pkg_reader import EntryFilter, ENTRY_FILTERS
+        from utils.file_operations import FileOperations
+        assert ENTRY_FILTERS["images"]("materials/A.PNG")
+        assert not ENTRY_FILTERS["images"]("scene.json")
+        assert EntryFilter(["materials/*"], ["*.json"])("materials/sub/a.tex")
+        assert not EntryFilter(["materials/*"], ["*.json"])("materials/a.json")  # exclude优先
+        assert ENTRY_FILTERS["textures"].extensions() == ["tex"]
+        assert EntryFilter(["materials/*.tex"]).extensions() is None
+        assert FileOperations.get_extract_command("a.pkg", "out", "RePKG.exe", ENTRY_FILTERS["textures"])[-2:] == \
+            ["--onlyexts", "tex"]
+        # RePKG无法表达的条件改用内置解析器
+        assert FileOperations.get_extract_command("a.pkg", "out", "RePKG.exe", EntryFilter(["models/*"])) is None
+
+        with tempfile.TemporaryDirectory() as tmp:
+            pkg_path = os.path.join(tmp, "scene.pkg")
+            with open(pkg_path, "wb") as f:
+                f.write(build_test_pkg([
+                    ("scene.json", b"{}"),
+                    ("materials/a.tex", build_test_tex(4, 4, bytes(range(64)))),
+                    ("materials/b.png", b"png"),
+                    ("models/m.json", b"{}"),
+                    ("videos/v.tex", build_test_video_tex(b"MP4DATA")),
+                ]))
+
+            out = os.path.join(tmp, "images")
+            written = FileOperations.extract_pkg(pkg_path, out, entry_filter=ENTRY_FILTERS["images"])
+            names = sorted(os.path.relpath(p, out).replace(os.sep, "/") for p in written)
+            assert names == ["materials/a.png", "materials/b.png"]  # 纹理只写出转换后的图片，视频纹理跳过
+            assert sorted(os.listdir(out)) == ["materials"]
+
+            # 不筛选时视频纹理照常转换为mp4
+            out = os.path.join(tmp, "all")
+            FileOperations.extract_pkg(pkg_path, out)
+            with open(os.path.join(out, "videos", "v.mp4"), "rb") as f:
+                assert f.read() == b"MP4DATA"
+
+            out = os.path.join(tmp, "textures")
+            written = FileOperations.extract_pkg(pkg_path, out, convert_textures=False,
+                                                 entry_filter=ENTRY_FILTERS["textures"])
+            assert [os.path.basename(p) for p in written] == ["a.tex", "v.tex"]
+
+        print("✓ 选择性提取工作正常")
+        return True
+    except Exception as e:
+        print(f"✗ 选择性提取测试失败: {e!r}")
+        return False
+
+def test_organize():
+    """测试按壁纸文件夹整理和整理清单"""
+    try:
+        import json
+        from utils.file_operations import FileOperations, ORGANIZED_MANIFEST
+
+        def make_extracted(path):
+            os.makedirs(os.path.join(path, "materials", "sub"))
+            for name in ("materials/a.png", "materials/sub/a.png", "scene.json"):
+                with open(os.path.join(path, name), "wb") as f:
+                    f.write(b"x")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            first = os.path.join(tmp, "first")
+            second = os.path.join(tmp, "second")
+            make_extracted(first)
+            make_extracted(second)
+
+            # 只整理指定的文件夹
+            assert FileOperations.organize_item_directory(first)
+            assert sorted(os.listdir(first)) == [ORGANIZED_MANIFEST, "a.png", "a_1.png"]
+            with open(os.path.join(first, ORGANIZED_MANIFEST), encoding="utf-8") as f:
+                assert json.load(f)["files"] == ["a.png", "a_1.png"]
+            assert os.path.isdir(os.path.join(second, "materials"))
+            assert not FileOperations.organize_item_directory(first)  # 已整理，没有materials
+        print("✓ 文件整理工作正常")
+        return True
+    except Exception as e:
+        print(f"✗ 文件整理测试失败: {e!r}")
+        return False
+
+def test_file_placement():
+    """测试文件放置策略"""
+    try:
+        from utils.file_placement import (
+            place_file, _kernel_copy, METHOD_REFLINK, METHOD_HARDLINK, METHOD_BUFFERED
+        )
+        from utils.file_operations import FileOperations
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "video.mp4")
+            data = os.urandom(300000)
+            with open(source, "wb") as f:
+                f.write(data)
+            os.utime(source, ns=(1_000_000_000, 2_000_000_000))
+
+            def read(path):
+                with open(path, "rb") as f:
+                    return f.read()
+
+            for strategy in ("auto", "clone", "copy"):
+                target = os.path.join(tmp, f"{strategy}.mp4")
+                method = place_file(source, target, strategy)
+                assert read(target) == data
+                assert os.stat(target).st_mtime_ns == 2_000_000_000
+                if strategy == "auto":
+                    assert method in (METHOD_REFLINK, METHOD_HARDLINK)  # 同一文件系统
+                else:
+                    assert method != METHOD_HARDLINK
+                    assert not os.path.samefile(source, target)
+
+            # 替换一个与其他文件硬链接的目标时，不改动那个文件
+            other = os.path.join(tmp, "other.bin")
+            with open(other, "wb") as f:
+                f.write(b"other")
+            target = os.path.join(tmp, "linked.mp4")
+            os.link(other, target)
+            place_file(source, target, "copy")
+            assert read(other) == b"other" and read(target) == data
+
+            try:
+                place_file(source, target, "nope")
+                assert False
+            except ValueError:
+                pass
+
+            # copy_file_range/sendfile一开始就返回0时视为不支持，改用缓冲复制；复制到一半返回0时报错
+            saved = getattr(os, "copy_file_range", None), getattr(os, "sendfile", None)
+            try:
+                os.copy_file_range = lambda *args: 0
+                os.sendfile = lambda *args: 0
+                assert place_file(source, target, "copy") == METHOD_BUFFERED
+                assert read(target) == data
+
+                def partial(src, dst, count):
+                    if os.lseek(src, 0, os.SEEK_CUR) >= 5000:
+                        return 0
+                    return os.write(dst, os.read(src, 1000))
+                os.copy_file_range = partial
+                try:
+                    _kernel_copy(source, target)
+                    assert False
+                except OSError:
+                    pass
+                assert place_file(source, target, "copy") == METHOD_BUFFERED
+                assert read(target) == data
+            finally:
+                for name, value in zip(("copy_file_range", "sendfile"), saved):
+                    if value is None:
+                        delattr(os, name)
+                    else:
+                        setattr(os, name, value)
+
+            out = os.path.join(tmp, "out")
+            os.makedirs(out)
+            assert FileOperations.copy_file_to_directory(source, out, "copy")
+            assert read(os.path.join(out, "video.mp4")) == data
+        print("✓ 文件放置工作正常")
+        return True
+    except Exception as e:
+        print(f"✗ 文件放置测试失败: {e!r}")
+        return False
+
+FAKE_REPKG = """import os, sys
+args = sys.argv[1:]
+recursive = args[1] == "-r"
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "calls.log"), "a") as log:
+    log.write("group\\n" if recursive else "single\\n")
+
+def extract(path, target):
+    with open(path, "rb") as src:
+        data = src.read()
+    if data == b"bad":
+        sys.exit("corrupt package")  # 与RePKG一样，遇到损坏的PKG时中止
+    os.makedirs(target, exist_ok=True)
+    with open(os.path.join(target, "out.bin"), "wb") as dst:
+        dst.write(data)
+
+if not recursive:
+    assert args[2] == "-o"
+    extract(args[1], args[3])
+else:
+    assert args[3] == "-o"
+    for root, dirs, files in sorted(os.walk(args[2])):
+        for name in files:
+            if name.endswith(".pkg"):
+                extract(os.path.join(root, name), os.path.join(args[4], os.path.basename(root)))
+"""
+
+def test_repkg_group():
+    """测试RePKG分组调用"""
+    try:
+        if os.name != "posix":
+            print("✓ 跳过（需要可执行脚本）")
+            return True
+        from utils import batch_extract
+        from utils.batch_extract import find_batch_items, BatchExtractor, extract_repkg_group
+        with tempfile.TemporaryDirectory() as tmp:
+            repkg = os.path.join(tmp, "RePKG")
+            with open(repkg, "w") as f:
+                f.write(f"#!{sys.executable}\n" + FAKE_REPKG)
+            os.chmod(repkg, 0o755)
+            src = os.path.join(tmp, "workshop")
+            out = os.path.join(tmp, "out")
+            for i in range(10):
+                os.makedirs(os.path.join(src, str(i)))
+                with open(os.path.join(src, str(i), "scene.pkg"), "wb") as f:
+                    f.write(f"pkg{i}".encode())
+            os.makedirs(os.path.join(src, "v"))
+            with open(os.path.join(src, "v", "a.mp4"), "wb") as f:
+                f.write(b"video")
+
+            items = find_batch_items(src, out)
+            progress = BatchExtractor(items, max_workers=2, repkg_path=repkg, group_size=4).run()
+            assert progress.done == 11 and progress.failed == 0
+            with open(os.path.join(tmp, "calls.log")) as f:
+                assert f.read().split() == ["group"] * 3  # 10个PKG分为3组，每组一次调用
+            for i in range(10):
+                with open(os.path.join(out, str(i), "out.bin"), "rb") as f:
+                    assert f.read() == f"pkg{i}".encode()  # 结果回到各自的输出目录
+            assert os.path.exists(os.path.join(out, "v", "a.mp4"))
+            assert sorted(os.listdir(out)) == sorted([str(i) for i in range(10)] + ["v"])  # 临时目录已清理
+
+            # 一个损坏的PKG不会让整组失败：整组改为逐个提取
+            os.remove(os.path.join(tmp, "calls.log"))
+            with open(os.path.join(src, "3", "scene.pkg"), "wb") as f:
+                f.write(b"bad")
+            out = os.path.join(tmp, "out2")
+            items = find_batch_items(src, out)
+            errors = extract_repkg_group([(item.source, item.save_dir) for item in items[:4]], repkg)
+            assert [error is None for error in errors] == [True, True, True, False]
+            for i in range(3):
+                with open(os.path.join(out, str(i), "out.bin"), "rb") as f:
+                    assert f.read() == f"pkg{i}".encode()
+            with open(os.path.join(tmp, "calls.log")) as f:
+                assert f.read().split() == ["group"] + ["single"] * 4
+
+            # 无法链接的PKG单独提取，不复制到临时目录
+            os.remove(os.path.join(tmp, "calls.log"))
+            out = os.path.join(tmp, "out3")
+            items = find_batch_items(src, out)
+            original_link = batch_extract._link
+            batch_extract._link = lambda source, target: (
+                os.path.basename(os.path.dirname(source)) != "5" and original_link(source, target))
+            try:
+                errors = extract_repkg_group([(item.source, item.save_dir) for item in items[4:7]], repkg)
+            finally:
+                batch_extract._link = original_link
+            assert errors == [None, None, None]
+            for i in range(4, 7):
+                with open(os.path.join(out, str(i), "out.bin"), "rb") as f:
+                    assert f.read() == f"pkg{i}".encode()
+            with open(os.path.join(tmp, "calls.log")) as f:
+                assert sorted(f.read().split()) == ["group", "single"]
+        print("✓ RePKG分组调用工作正常")
+        return True
+    except Exception as e:
+        print(f"✗ RePKG分组调用测试失败: {e!r}")
+        return False
+
 def main():
     """运行所有测试"""
     print("=== RePKG GUI 模块化重构测试 ===")
@@ -67,7 +854,23 @@ def main():
         ("模块导入", test_imports),
         ("配置管理器", test_config_manager), 
         ("文件操作", test_file_operations),
-        ("版本检查器", test_version_checker)
+        ("版本检查器", test_version_checker),
+        ("PKG解析器", test_pkg_reader),
+        ("TEX纹理解码", test_tex_decoder),
+        ("DXT纹理解码", test_dxt_decoder),
+        ("PKG缩略图", test_pkg_thumbnail),
+        ("壁纸库索引", test_library_index),
+        ("缩略图缓存", test_thumbnail_cache),
+        ("壁纸列表模型", test_wallpaper_model),
+        ("搜索索引", test_search_index),
+        ("元数据缓存", test_metadata_cache),
+        ("分面筛选", test_facets),
+        ("预排序索引", test_sort_index),
+        ("选择性提取", test_entry_filter),
+        ("文件整理", test_organize),
+        ("文件放置", test_file_placement),
+        ("批量提取", test_batch_extract),
+        ("RePKG分组调用", test_repkg_group)
     ]
     
     passed = 0
@@ -5,20 +5,33 @@
 
 import sys
 import os
-import json
 import glob
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QTabWidget, QVBoxLayout, QLabel, QPushButton,
     QHBoxLayout, QGridLayout, QFileDialog, QProgressBar, QMessageBox, QColorDialog
 )
-from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtCore import Qt, QTimer, QThread, QThreadPool
 from PyQt6.QtGui import QPixmap, QMovie
 
 from utils.config_manager import ConfigManager
 from utils.file_operations import FileOperations
 from utils.version_checker import VersionChecker
-from utils.workers import ExtractWorker, ImageLoadWorker, SearchIndexWorker
+from utils.library_index import LibraryIndex
+from utils.metadata import get_metadata_cache, PROJECT_FILE
+from utils.thumbnail_cache import (
+    ThumbnailDiskCache, ThumbnailMemoryCache, DEFAULT_CACHE_MB, DEFAULT_MEMORY_CACHE_MB,
+    DEFAULT_PREVIEW_CACHE_MB
+)
+from utils.thumbnails import PREVIEW_SIZE
+from utils.workers import (
+    ExtractWorker, PkgExtractWorker, ImageLoadWorker, LibraryScanWorker, MetadataLoadWorker,
+    SearchIndexWorker, SearchQueryWorker, BatchExtractWorker
+)
+from utils.batch_extract import REPKG_GROUP_SIZE
+from utils.pkg_reader import ENTRY_FILTERS
+from utils.file_placement import DEFAULT_PLACEMENT_STRATEGY
 from ui.tabs import TabCreator
+from ui.wallpaper_grid import PathRole
 
 
 class RePKGGUI(QWidget):
@@ -30,26 +43,30 @@ class RePKGGUI(QWidget):
         self.currentImagePath = None
         self.previewImages = []
         self.originalPreviewImages = []
-        self.thumbnail_widgets = []
-        self.search_index = []
+        self.search_index = None
+        self.search_results = None  # 最近一次搜索的结果，没有查询时为None
+        self.search_serial = 0
+        self.facet_index = None
+        self.sort_index = None
+        self.library_items = []
+        self.retiredWorkers = []
+        self.previewLoaders = {}  # 路径 -> 进行中的预览加载
         
         # 初始化工具类
         self.config_manager = ConfigManager()
+        self.library_index = LibraryIndex(self.config_manager.get_library_index_path())
         self.file_ops = FileOperations()
         self.version_checker = VersionChecker()
         self.tab_creator = TabCreator(self)
         
-        # 分页相关属性
-        self.current_page = 0
-        self.items_per_page = 30
-        self.total_pages = 0
+        self.scanning = False
         
-        # 检查RePKG.exe是否存在
+        # 检查RePKG.exe是否存在（只有Windows上会使用RePKG.exe，其他平台直接使用内置解析器，不提示）
         self.repkg_path = self.file_ops.find_repkg_exe()
-        if not self.repkg_path:
+        if not self.repkg_path and sys.platform == "win32":
             msg = QMessageBox()
             msg.setWindowTitle('缺少RePKG.exe')
-            msg.setText('未找到RePKG.exe，请确保RePKG.exe位于程序目录下。\\n是否继续运行？（仅能提取未加密的图片和视频）')
+            msg.setText('未找到RePKG.exe，请确保RePKG.exe位于程序目录下。\\n是否继续运行？（将使用内置解析器提取PKG）')
             
             # 添加GitHub按钮
             github_btn = QPushButton("GitHub")
@@ -63,7 +80,7 @@ class RePKGGUI(QWidget):
             reply = msg.exec()
             if reply == QMessageBox.StandardButton.No:
                 sys.exit()
-        else:
+        elif self.repkg_path:
             # 检查版本
             local_version = self.version_checker.check_repkg_version(self.repkg_path)
             latest_version = self.version_checker.get_latest_repkg_version()
@@ -122,8 +139,8 @@ class RePKGGUI(QWidget):
         self.progressBar.setFormat("加载中... %p% (%v/%m)")
         self.mainLayout.addWidget(self.progressBar, 1, 0, 1, 3)
         
-        # 6. 添加左下角页码信息标签
-        self.pageLabel = QLabel("第 1 页，共 1 页")
+        # 6. 添加左下角壁纸数量标签
+        self.pageLabel = QLabel("共 0 个壁纸")
         self.pageLabel.setAlignment(Qt.AlignmentFlag.AlignLeft)
         self.pageLabel.setStyleSheet("color: gray; font-size: 12px; padding: 5px;")
         self.mainLayout.addWidget(self.pageLabel, 2, 0, 1, 1)
@@ -131,6 +148,26 @@ class RePKGGUI(QWidget):
         # 7. 设置创意工坊目录
         self.workshopDirectory = workshop_dir
         
+        # 缩略图缓存（缩略图网格在创建标签页时需要用到）
+        cache_mb = config.get("thumbnail_cache_mb", DEFAULT_CACHE_MB)
+        self.thumbnail_cache = ThumbnailDiskCache(
+            self.config_manager.get_thumbnail_cache_dir(), cache_mb * 1024 * 1024)
+        memory_mb = config.get("thumbnail_memory_mb", DEFAULT_MEMORY_CACHE_MB)
+        self.memory_cache = ThumbnailMemoryCache(memory_mb * 1024 * 1024)
+        self.preview_cache = ThumbnailMemoryCache(DEFAULT_PREVIEW_CACHE_MB * 1024 * 1024)
+        
+        # 滚动时限频重排缩略图加载顺序
+        self.viewportTimer = QTimer(self)
+        self.viewportTimer.setSingleShot(True)
+        self.viewportTimer.setInterval(50)
+        self.viewportTimer.timeout.connect(self.update_thumbnail_priorities)
+        
+        # 输入停顿后再搜索，连续输入时不反复刷新网格
+        self.searchTimer = QTimer(self)
+        self.searchTimer.setSingleShot(True)
+        self.searchTimer.setInterval(150)
+        self.searchTimer.timeout.connect(self.run_search)
+        
         # 8. 添加选项卡
         self.pkgTab = self.tab_creator.create_pkg_tab()
         self.manualTab = self.tab_creator.create_manual_tab()
@@ -155,19 +192,65 @@ class RePKGGUI(QWidget):
         self.savePathEdit.setText(defaultSavePath)
         self.savePathEdit.setPlaceholderText(f"当前: {defaultSavePath}")
         
-        # 11. 遍历目录加载预览
+        # 11. 排序方式
+        self.sortCombo.blockSignals(True)
+        self.sortCombo.setCurrentIndex(max(0, self.sortCombo.findData(config.get("sort_key") or None)))
+        self.sortCombo.blockSignals(False)
+        self.sortDescendingCheck.blockSignals(True)
+        self.sortDescendingCheck.setChecked(bool(config.get("sort_descending", False)))
+        self.sortDescendingCheck.setEnabled(bool(self.sortCombo.currentData()))
+        self.sortDescendingCheck.blockSignals(False)
+        self.sortCombo.currentIndexChanged.connect(self.on_sort_changed)
+        self.sortDescendingCheck.toggled.connect(self.on_sort_changed)
+
+        # 12. 缩略图缓存设置
+        self.cacheSizeSpin.setValue(cache_mb)
+        self.cacheSizeSpin.valueChanged.connect(self.change_thumbnail_cache_size)
+
+        # 批量提取并行数（0为自动）
+        self.batchWorkersSpin.setValue(config.get("batch_workers", 0))
+        self.batchWorkersSpin.valueChanged.connect(self.save_config)
+
+        # 手动提取的内容筛选
+        self.extractFilterCombo.setCurrentIndex(
+            max(0, self.extractFilterCombo.findData(config.get("extract_filter") or None)))
+        self.extractFilterCombo.currentIndexChanged.connect(self.save_config)
+
+        # 文件放置方式
+        self.placementCombo.setCurrentIndex(max(0, self.placementCombo.findData(
+            config.get("placement_strategy", DEFAULT_PLACEMENT_STRATEGY))))
+        self.placementCombo.currentIndexChanged.connect(self.save_config)
+        
+        # 13. 遍历目录加载预览
         self.traverse_directory()
     
     # ------------------------- 配置和设置 -------------------------
     
     def save_config(self):
-        """保存配置"""
-        config_data = {
+        """保存配置（保留配置文件中的其他项）"""
+        config_data = self.config_manager.load_config()
+        config_data.update({
             "save_path": self.savePathEdit.text(),
             "workshop_dir": self.workshopDirectory,
-            "custom_title": self.customTitleEdit.text()
-        }
+            "custom_title": self.customTitleEdit.text(),
+            "thumbnail_cache_mb": self.cacheSizeSpin.value(),
+            "sort_key": self.sortCombo.currentData() or "",
+            "sort_descending": self.sortDescendingCheck.isChecked(),
+            "batch_workers": self.batchWorkersSpin.value(),
+            "extract_filter": self.extractFilterCombo.currentData() or "",
+            "placement_strategy": self.placementCombo.currentData()
+        })
         self.config_manager.save_config(config_data)
+
+    def change_thumbnail_cache_size(self, value):
+        """修改缩略图缓存上限，超出部分在后台线程中淘汰"""
+        self.thumbnail_cache.set_max_bytes(value * 1024 * 1024)
+        QThreadPool.globalInstance().start(self.thumbnail_cache.trim)
+        self.save_config()
+
+    def clear_thumbnail_cache(self):
+        """清空缩略图磁盘缓存"""
+        self.thumbnail_cache.clear()
     
     def apply_custom_title(self):
         """应用自定义标题"""
@@ -201,6 +284,17 @@ class RePKGGUI(QWidget):
             self.versionLabel.setText("检查更新失败\\n(检查更新功能维护中)")
             print(f"检查更新出错: {e}")
     
+    def retire_worker(self, worker, *signal_names):
+        """停用仍在运行的工作线程：断开指定信号、请求取消（如支持），并保留引用直到线程退出，
+        避免运行中的QThread被回收；同时清理已经退出的旧线程。已经停用过的线程不再重复断开信号"""
+        if worker is not None and worker.isRunning() and worker not in self.retiredWorkers:
+            for name in signal_names:
+                getattr(worker, name).disconnect()
+            if hasattr(worker, 'cancel'):
+                worker.cancel()
+            self.retiredWorkers.append(worker)
+        self.retiredWorkers = [w for w in self.retiredWorkers if w.isRunning()]
+
     # ------------------------- 目录和文件处理 -------------------------
     
     def traverse_directory(self):
@@ -213,77 +307,54 @@ class RePKGGUI(QWidget):
         else:
             print(f"创意工坊目录: {directory}")
 
+        # 停止上一次尚未完成的扫描，以及为上一次扫描结果构建索引、加载元数据和执行查询的线程
+        # （否则迟到的结果会把旧目录的索引装回来）
+        self.retire_worker(getattr(self, 'scanWorker', None), 'itemsFound', 'finished')
+        self.retire_worker(getattr(self, 'searchWorker', None), 'indexBuilt')
+        self.retire_worker(getattr(self, 'metadataWorker', None))
+        self.retire_worker(getattr(self, 'searchQueryWorker', None), 'resultsReady')
+
+        self.library_items = []
         self.previewImages = []
-        entries = [e for e in os.scandir(directory) if e.is_dir()]
-        for root, _, files in os.walk(directory):
-            for file in files:
-                if file in ['preview.jpg', 'preview.gif']:
-                    self.previewImages.append(os.path.join(root, file))
+        self.originalPreviewImages = []
+        self.search_index = None
+        self.facet_index = None
+        self.sort_index = None
+        self.reset_filters()
+        self.scanning = True
+        self.wallpaperModel.set_paths([])
+        self.update_page_info()
 
-        if not self.previewImages:
+        # 后台增量扫描：只重新读取修改时间变化的壁纸目录，结果分批推送
+        self.scanWorker = LibraryScanWorker(self.library_index, directory)
+        self.scanWorker.itemsFound.connect(self.on_library_items_found)
+        self.scanWorker.finished.connect(self.on_library_scan_finished)
+        self.scanWorker.start()
+
+    def on_library_items_found(self, items):
+        """扫描到一批壁纸的回调"""
+        self.library_items.extend(items)
+        previews = [item["preview"] for item in items if item["preview"]]
+        self.originalPreviewImages.extend(previews)
+        if not self.searchEdit.text().strip():
+            # 追加到网格末尾，无需等待整个扫描结束
+            self.previewImages.extend(previews)
+            self.wallpaperModel.append_paths(previews)
+        self.update_page_info()
+
+    def on_library_scan_finished(self):
+        """扫描完成回调"""
+        self.scanning = False
+        if not self.originalPreviewImages:
             print("警告：未找到任何预览图片")
 
-        # 备份原始列表并创建搜索索引
-        self.originalPreviewImages = list(self.previewImages)
+        # 创建搜索索引，并在后台预读所有project.json
         QTimer.singleShot(0, self.start_search_index_worker)
+        QTimer.singleShot(0, self.start_metadata_load_worker)
 
-        self.load_preview_images()
-    
-    def load_preview_images(self):
-        """加载预览图片"""
-        # 清理现有缩略图
-        for w in self.thumbnail_widgets:
-            w.deleteLater()
-        self.thumbnail_widgets.clear()
-        
-        # 计算总页数
-        total_images = len(self.previewImages)
-        self.total_pages = (total_images + self.items_per_page - 1) // self.items_per_page
-        
-        if self.total_pages == 0:
-            self.total_pages = 1
-        
-        # 确保当前页在有效范围内
-        if self.current_page >= self.total_pages:
-            self.current_page = self.total_pages - 1
-        if self.current_page < 0:
-            self.current_page = 0
-
-        # 获取当前页的图片范围
-        start_idx = self.current_page * self.items_per_page
-        end_idx = min(start_idx + self.items_per_page, total_images)
-        current_page_images = self.previewImages[start_idx:end_idx]
-
-        # 如果没有图片，直接返回
-        if not current_page_images:
-            self.update_page_info()
-            return
-
-        # 设置进度条
-        self.progressBar.setMaximum(len(current_page_images))
-        self.progressBar.setValue(0)
-        self.progressBar.setVisible(True)
-
-        # 预创建缩略图控件
-        for i in range(len(current_page_images)):
-            thumbnail = QLabel()
-            thumbnail.setFixedSize(180, 180)
-            thumbnail.setStyleSheet("border: 1px solid gray;")
-            thumbnail.setText("加载中...")
-            thumbnail.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.thumbnailLayout.addWidget(thumbnail, i // 3, i % 3)
-            self.thumbnail_widgets.append(thumbnail)
-
-        # 启动图片加载线程
-        self.loadWorker = ImageLoadWorker(current_page_images, start_idx)
-        self.loadWorker.imageLoaded.connect(self.on_image_loaded)
-        self.loadWorker.progressChanged.connect(self.on_progress_changed)
-        self.loadWorker.finished.connect(self.on_loading_finished)
-        self.loadWorker.start()
-        
-        # 更新分页信息显示
         self.update_page_info()
-    
+        self.schedule_viewport_update()
+
     def show_preview_image(self, imagePath):
         """显示预览图片"""
         self.currentImagePath = imagePath
@@ -291,104 +362,248 @@ class RePKGGUI(QWidget):
         workshopID = os.path.basename(os.path.dirname(imagePath))
         self.pathLabel.setText(f"ID: {workshopID}")
 
-        if fileExt in ['.jpg', '.jpeg']:
-            pixmap = QPixmap(imagePath)
-            self.previewLabel.setPixmap(pixmap.scaled(280, 280, Qt.AspectRatioMode.KeepAspectRatio,
-                                                     Qt.TransformationMode.SmoothTransformation))
-        elif fileExt == '.gif':
+        if fileExt == '.gif':
             movie = QMovie(imagePath)
             if movie.isValid():
                 self.previewLabel.setMovie(movie)
                 movie.start()
             else:
                 self.previewLabel.setText("GIF加载失败")
+        elif fileExt in ['.jpg', '.jpeg', '.png', '.pkg']:
+            # 最近显示过的直接取缓存，否则在缩略图线程池中解码，完成后再显示
+            image = self.preview_cache.get(imagePath, PREVIEW_SIZE)
+            if image is not None:
+                self.previewLabel.setPixmap(QPixmap.fromImage(image))
+            else:
+                self.previewLabel.setText("加载中...")
+                self.load_preview(imagePath)
         else:
             self.previewLabel.setText("不支持的格式")
 
-        # 读取project.json
-        pj = os.path.join(os.path.dirname(imagePath), "project.json")
-        if os.path.exists(pj):
-            try:
-                with open(pj, 'r', encoding='utf-8') as f:
-                    self.titleLabel.setText(json.load(f).get("title", "无标题"))
-            except:
-                self.titleLabel.setText("[读取壁纸信息失败]")
+        # 壁纸信息来自共享的元数据缓存（启动时已在后台批量加载）
+        item_path = os.path.dirname(imagePath)
+        metadata = get_metadata_cache().get(item_path)
+        if metadata is not None:
+            self.titleLabel.setText(metadata.title or "无标题")
+        elif os.path.exists(os.path.join(item_path, PROJECT_FILE)):
+            self.titleLabel.setText("[读取壁纸信息失败]")
         else:
             self.titleLabel.setText("[无project.json文件]")
     
-    # ------------------------- 分页控制 -------------------------
-    
+    def load_preview(self, imagePath):
+        """在后台解码280x280预览图并放入预览缓存（同一路径只加载一次）"""
+        if imagePath in self.previewLoaders:
+            return
+        loader = ImageLoadWorker([(0, imagePath)], 0, self.thumbnail_cache,
+                                 self.preview_cache, PREVIEW_SIZE)
+        loader.imageLoaded.connect(self.on_preview_loaded)
+        self.previewLoaders[imagePath] = loader
+        loader.start()
+
+    def prefetch_preview(self, imagePath):
+        """悬停或方向键经过时提前解码预览图"""
+        if not imagePath or imagePath.lower().endswith('.gif'):
+            return  # GIF由QMovie直接播放
+        if (imagePath, PREVIEW_SIZE) not in self.preview_cache:
+            self.load_preview(imagePath)
+
+    def on_preview_loaded(self, generation, index, imagePath, image):
+        """预览图解码完成回调：仍是当前选中的壁纸时才显示"""
+        self.previewLoaders.pop(imagePath, None)
+        if imagePath != self.currentImagePath:
+            return
+        if image is not None:
+            self.previewLabel.setPixmap(QPixmap.fromImage(image))
+        else:
+            self.previewLabel.setText("预览生成失败")
+
+    # ------------------------- 状态显示 -------------------------
+
     def update_page_info(self):
-        """更新分页信息显示"""
+        """更新左下角的壁纸数量显示"""
         if hasattr(self, 'pageLabel'):
-            page_text = f"第 {self.current_page + 1} 页，共 {self.total_pages} 页 (共 {len(self.previewImages)} 个壁纸)"
+            page_text = f"共 {len(self.previewImages)} 个壁纸"
+            if self.scanning:
+                page_text += " - 扫描中..."
             self.pageLabel.setText(page_text)
-        
-        # 更新按钮状态
-        if hasattr(self, 'prevBtn'):
-            self.prevBtn.setEnabled(self.current_page > 0)
-        if hasattr(self, 'nextBtn'):
-            self.nextBtn.setEnabled(self.current_page < self.total_pages - 1)
-
-    def go_to_previous_page(self):
-        """跳转到上一页"""
-        if self.current_page > 0:
-            self.current_page -= 1
-            self.load_preview_images()
-
-    def go_to_next_page(self):
-        """跳转到下一页"""
-        if self.current_page < self.total_pages - 1:
-            self.current_page += 1
-            self.load_preview_images()
-    
-    # ------------------------- 图片加载回调 -------------------------
-    
-    def on_image_loaded(self, index, imagePath, display_object):
-        """单个图片加载完成的回调"""
-        if index < len(self.thumbnail_widgets):
-            thumbnail = self.thumbnail_widgets[index]
-            if display_object is not None:
-                thumbnail.setPixmap(display_object)
-            else:
-                thumbnail.setText("加载失败")
-            
-            # 设置点击事件
-            thumbnail.mousePressEvent = lambda e, path=imagePath: self.show_preview_image(path)
 
-    def on_progress_changed(self, current, total):
-        """进度更新回调"""
-        self.progressBar.setValue(current)
-
-    def on_loading_finished(self):
-        """加载完成回调"""
-        self.progressBar.setVisible(False)
+    # ------------------------- 缩略图调度 -------------------------
+
+    def schedule_viewport_update(self, *args):
+        """视口变化后重排加载顺序（滚动过程中每50ms最多一次）"""
+        if not self.viewportTimer.isActive():
+            self.viewportTimer.start()
+
+    def update_thumbnail_priorities(self):
+        """按当前可见区域重新排定缩略图加载顺序"""
+        visible = self.thumbnailView.visible_rows()
+        if visible is not None:
+            self.wallpaperModel.set_viewport(*visible)
+
+    def on_thumbnail_hovered(self, index):
+        """鼠标悬停的条目提前加载缩略图和预览图"""
+        self.wallpaperModel.set_focus_row(index.row())
+        self.prefetch_preview(index.data(PathRole))
+
+    def on_thumbnail_clicked(self, index):
+        """点击缩略图：记为选中条目并显示预览"""
+        self.wallpaperModel.set_focus_row(index.row())
+        if index.data(PathRole) != self.currentImagePath:
+            self.show_preview_image(index.data(PathRole))
+
+    def on_current_thumbnail_changed(self, current, previous):
+        """当前条目变化（点击或方向键）：显示预览，并预取移动方向上的下一个条目"""
+        if not current.isValid():
+            return
+        self.wallpaperModel.set_focus_row(current.row())
+        self.show_preview_image(current.data(PathRole))
+        if previous.isValid() and previous.row() != current.row():
+            step = 1 if current.row() > previous.row() else -1
+            following = current.row() + step * abs(current.row() - previous.row())
+            if 0 <= following < self.wallpaperModel.rowCount():
+                self.prefetch_preview(self.wallpaperModel.index(following).data(PathRole))
 
     # ------------------------- 搜索索引 -------------------------
 
     def start_search_index_worker(self):
         """启动异步搜索索引构建"""
-        if hasattr(self, 'searchWorker') and self.searchWorker.isRunning():
-            self.searchWorker.terminate()
-        self.searchWorker = SearchIndexWorker(self.originalPreviewImages)
+        self.retire_worker(getattr(self, 'searchWorker', None), 'indexBuilt')
+        self.searchWorker = SearchIndexWorker(self.library_items)
         self.searchWorker.indexBuilt.connect(self.on_search_index_built)
         self.searchWorker.start()
 
-    def on_search_index_built(self, index):
-        """搜索索引构建完成回调"""
+    def start_metadata_load_worker(self):
+        """在后台批量加载元数据缓存，之后点击和提取时不再读取磁盘"""
+        self.retire_worker(getattr(self, 'metadataWorker', None))
+        self.metadataWorker = MetadataLoadWorker(list(self.library_items))
+        self.metadataWorker.start(QThread.Priority.LowPriority)
+
+    def on_search_index_built(self, index, facet_index, sort_index):
+        """搜索、分面和排序索引构建完成回调"""
         self.search_index = index
+        self.facet_index = facet_index
+        self.sort_index = sort_index
+        self.populate_filters()
+        # 索引就绪前输入的查询在此时执行
+        if self.searchEdit.text().strip():
+            self.run_search()
+        else:
+            self.refresh_wallpaper_list()
 
     def search_wallpapers(self, text):
-        """根据标题搜索壁纸"""
-        query = text.strip().lower()
-        if query:
-            matched = [item["path"] for item in self.search_index if query in item["title"]]
-            self.previewImages = matched
+        """搜索框内容变化：延迟执行搜索"""
+        self.searchTimer.start()
+
+    def run_search(self):
+        """在后台线程中执行当前查询"""
+        self.search_serial += 1
+        query = self.searchEdit.text().strip()
+        if not query:
+            self.search_results = None
+            self.refresh_wallpaper_list()
+            return
+        if self.search_index is None:
+            return  # 索引构建完成后会重新执行
+
+        self.retire_worker(getattr(self, 'searchQueryWorker', None), 'resultsReady')
+
+        self.searchQueryWorker = SearchQueryWorker(self.search_index, query, self.search_serial)
+        self.searchQueryWorker.resultsReady.connect(self.on_search_results)
+        self.searchQueryWorker.start()
+
+    def on_search_results(self, serial, paths):
+        """搜索结果回调，只接受最新一次查询的结果"""
+        if serial == self.search_serial:
+            self.search_results = paths
+            self.refresh_wallpaper_list()
+
+    def refresh_wallpaper_list(self):
+        """按搜索结果、分面筛选条件和排序方式重新计算显示的壁纸列表"""
+        paths = self.search_results
+        selection = self.current_filter_selection()
+        filtering = self.facet_index is not None and any(selection.values())
+        sort_key = self.sortCombo.currentData() if self.sort_index is not None else None
+        descending = self.sortDescendingCheck.isChecked()
+
+        if sort_key and paths is None:
+            # 没有搜索时直接按预排序的排列取值，筛选只是对排列做一次掩码
+            mask = self.facet_index.mask(selection) if filtering else None
+            paths = self.sort_index.sorted_keys(sort_key, descending, mask)
         else:
-            self.previewImages = list(self.originalPreviewImages)
-        self.current_page = 0
-        self.load_preview_images()
+            if filtering:
+                paths = self.facet_index.filter(selection, paths)
+            elif paths is None:
+                paths = list(self.originalPreviewImages)
+            if sort_key:
+                paths = self.sort_index.sort(paths, sort_key, descending)
+        self.set_wallpaper_list(paths)
+
+    def on_sort_changed(self, *args):
+        """排序方式变化"""
+        self.sortDescendingCheck.setEnabled(bool(self.sortCombo.currentData()))
+        self.refresh_wallpaper_list()
+        self.save_config()
+
+    def set_wallpaper_list(self, paths):
+        """刷新网格，列表未变化时不重置"""
+        if paths == self.previewImages:
+            return
+        self.previewImages = paths
+        self.wallpaperModel.set_paths(self.previewImages)
+        self.thumbnailView.scrollToTop()
+        self.update_page_info()
+        self.schedule_viewport_update()
     
+    # ------------------------- 分面筛选 -------------------------
+
+    def current_filter_selection(self):
+        """返回各分面下拉框的选择 {分面: 选中的取值集合}"""
+        selection = {}
+        for facet, combo in self.filterCombos.items():
+            value = combo.currentData()
+            selection[facet] = {value} if value else set()
+        return selection
+
+    def reset_filters(self):
+        """清空并禁用筛选下拉框（重新扫描期间分面索引不可用）"""
+        for combo in self.filterCombos.values():
+            combo.blockSignals(True)
+            combo.clear()
+            combo.addItem("全部", None)
+            combo.setEnabled(False)
+            combo.blockSignals(False)
+
+    def populate_filters(self):
+        """分面索引就绪后填充下拉框，尽量保留之前的选择"""
+        for facet, combo in self.filterCombos.items():
+            previous = combo.currentData()
+            combo.blockSignals(True)
+            combo.clear()
+            combo.addItem("全部", None)
+            for value in self.facet_index.values(facet):
+                combo.addItem(value, value)
+            index = combo.findData(previous) if previous else 0
+            combo.setCurrentIndex(max(0, index))
+            combo.setEnabled(True)
+            combo.blockSignals(False)
+        self.update_filter_counts()
+
+    def update_filter_counts(self):
+        """在各取值后显示其他筛选条件下的条目数"""
+        if self.facet_index is None:
+            return
+        selection = self.current_filter_selection()
+        for facet, combo in self.filterCombos.items():
+            counts = self.facet_index.counts(facet, selection)
+            for i in range(1, combo.count()):
+                value = combo.itemData(i)
+                combo.setItemText(i, f"{value} ({counts.get(value, 0)})")
+
+    def on_filter_changed(self, *args):
+        """筛选条件变化"""
+        self.update_filter_counts()
+        self.refresh_wallpaper_list()
+
     # ------------------------- 文件选择 -------------------------
     
     def browse_save_directory(self):
@@ -453,7 +668,8 @@ class RePKGGUI(QWidget):
 
         def after_extract():
             print("开始整理文件")
-            self.file_ops.organize_extracted_files(self.savePathEdit.text())
+            # 只整理刚提取的壁纸，保存目录中以前的壁纸不再重新遍历
+            self.file_ops.organize_item_directory(save_dir)
             if btn:
                 btn.setText("提取并整理完成")
                 btn.setEnabled(True)
@@ -476,15 +692,15 @@ class RePKGGUI(QWidget):
         os.makedirs(save_dir, exist_ok=True)
 
         if target.lower().endswith('.mp4') or target.lower().endswith(('.jpg', '.jpeg', '.png')):
-            if self.file_ops.copy_file_to_directory(target, save_dir):
+            if self.file_ops.copy_file_to_directory(target, save_dir, self.placementCombo.currentData()):
                 after_extract()
             else:
                 if btn:
                     btn.setText("复制失败")
                     btn.setEnabled(True)
         else:
-            # 使用 RePKG 异步提取，然后连接到整理逻辑
-            self.worker = ExtractWorker([self.repkg_path, "extract", target, "-o", save_dir])
+            # 异步提取PKG（整理只保留图片，其余条目不写出），然后连接到整理逻辑
+            self.worker = self.create_extract_worker(target, save_dir, ENTRY_FILTERS["images"])
             self.worker.finished.connect(after_extract)
             self.worker.error.connect(lambda msg: self.on_extract_error(btn, msg))
             self.worker.start()
@@ -508,7 +724,7 @@ class RePKGGUI(QWidget):
         
         # 根据文件类型处理
         if target.lower().endswith('.mp4') or target.lower().endswith(('.png', '.jpg', '.jpeg')):
-            if self.file_ops.copy_file_to_directory(target, save_dir):
+            if self.file_ops.copy_file_to_directory(target, save_dir, self.placementCombo.currentData()):
                 print("文件复制完成")
                 if btn:
                     btn.setText("复制完成")
@@ -516,14 +732,8 @@ class RePKGGUI(QWidget):
                 if btn:
                     btn.setText("复制失败")
         else:
-            # 使用RePKG提取PKG文件
-            if not self.repkg_path:
-                QMessageBox.warning(self, '错误', '未找到RePKG.exe，无法进行PKG提取！')
-                if btn:
-                    btn.setText("RePKG.exe未找到")
-                return
-            
-            self.worker = ExtractWorker([self.repkg_path, "extract", target, "-o", save_dir])
+            # 提取PKG文件（无RePKG.exe时使用内置解析器）
+            self.worker = self.create_extract_worker(target, save_dir)
             self.worker.finished.connect(lambda: self.on_extract_finished(btn))
             self.worker.error.connect(lambda msg: self.on_extract_error(btn, msg))
             self.worker.start()
@@ -546,7 +756,7 @@ class RePKGGUI(QWidget):
         
         # 如果是mp4文件，直接复制
         if file_path.lower().endswith('.mp4'):
-            if self.file_ops.copy_file_to_directory(file_path, save_dir):
+            if self.file_ops.copy_file_to_directory(file_path, save_dir, self.placementCombo.currentData()):
                 print("MP4文件复制完成")
                 if btn:
                     btn.setText("复制完成")
@@ -555,9 +765,8 @@ class RePKGGUI(QWidget):
                     btn.setText("复制失败")
         else:
             # 处理PKG文件
-            cmd = self.file_ops.get_extract_command(file_path, save_dir, self.repkg_path)
-            if cmd:
-                self.worker = ExtractWorker(cmd)
+            if file_path.lower().endswith('.pkg'):
+                self.worker = self.create_extract_worker(file_path, save_dir, self.current_entry_filter())
                 self.worker.finished.connect(lambda: self.on_extract_finished(btn))
                 self.worker.error.connect(lambda msg: self.on_extract_error(btn, msg))
                 self.worker.start()
@@ -570,23 +779,60 @@ class RePKGGUI(QWidget):
                     btn.setText("不支持")
 
     def batch_extract(self):
-        """批量提取"""
+        """批量提取：提取文件夹下的所有壁纸，提取进行中时再次点击则停止"""
+        if hasattr(self, 'batchWorker') and self.batchWorker.isRunning():
+            self.batchWorker.cancel()
+            self.batchBtn.setEnabled(False)
+            self.batchBtn.setText("正在停止...")
+            return
+
         directory = self.batchPathEdit.text()
         if not directory or not os.path.isdir(directory):
             print("无效文件夹")
             return
-        
-        for root, _, files in os.walk(directory):
-            target_file = None
-            if "scene.pkg" in files:
-                target_file = os.path.join(root, "scene.pkg")
-            elif any(f.lower().endswith('.mp4') for f in files):
-                mp4_files = [f for f in files if f.lower().endswith('.mp4')]
-                target_file = os.path.join(root, mp4_files[0])
-            
-            if target_file:
-                self.extract_single_file(target_file)
-                break
+
+        # 查找壁纸期间进度条显示为忙碌状态
+        self.progressBar.setRange(0, 0)
+        self.progressBar.setFormat("正在查找壁纸...")
+        self.progressBar.setVisible(True)
+        self.batchBtn.setText("停止")
+        self.batchStatusLabel.setText("正在查找壁纸...")
+
+        # 使用RePKG.exe时每次调用提取的PKG数（配置项，1为逐个调用）
+        group_size = self.config_manager.load_config().get("repkg_group_size", REPKG_GROUP_SIZE)
+        self.batchWorker = BatchExtractWorker(directory, self.savePathEdit.text(),
+                                              self.batchWorkersSpin.value() or None,
+                                              self.repkg_path, group_size, self.current_entry_filter(),
+                                              self.placementCombo.currentData())
+        self.batchWorker.itemsFound.connect(self.on_batch_items_found)
+        self.batchWorker.progress.connect(self.on_batch_progress)
+        self.batchWorker.finished.connect(self.on_batch_finished)
+        self.batchWorker.start()
+
+    def on_batch_items_found(self, count):
+        """批量提取：查找壁纸完成"""
+        self.progressBar.setRange(0, max(count, 1))
+        self.progressBar.setValue(0)
+        self.progressBar.setFormat("批量提取 %p% (%v/%m)")
+        self.batchStatusLabel.setText(f"共 {count} 个壁纸")
+
+    def on_batch_progress(self, progress):
+        """批量提取进度"""
+        self.progressBar.setValue(progress.done)
+        self.batchStatusLabel.setText(progress.summary())
+
+    def on_batch_finished(self, progress):
+        """批量提取结束"""
+        self.progressBar.setVisible(False)
+        self.batchBtn.setEnabled(True)
+        self.batchBtn.setText("开始批量提取")
+        if not progress.total:
+            print("未找到可提取文件")
+            self.batchStatusLabel.setText("未找到可提取文件")
+            return
+        state = "已完成" if progress.done == progress.total else "已停止"
+        self.batchStatusLabel.setText(f"{state}: {progress.summary()}，用时 {progress.elapsed:.1f} 秒")
+        print(f"批量提取{state}: {progress.summary()}")
     
     def open_current_directory(self):
         """打开当前文件所在目录"""
@@ -613,6 +859,17 @@ class RePKGGUI(QWidget):
             # 如果没有选择文件，可以显示提示信息
             print("请先选择一个壁纸文件")
     
+    def current_entry_filter(self):
+        """手动提取标签页选择的条目筛选条件，全部文件时为None"""
+        return ENTRY_FILTERS.get(self.extractFilterCombo.currentData())
+
+    def create_extract_worker(self, pkg_path, save_dir, entry_filter=None):
+        """创建PKG提取线程：优先使用RePKG.exe，否则（或筛选条件RePKG无法表达时）使用内置解析器"""
+        cmd = self.file_ops.get_extract_command(pkg_path, save_dir, self.repkg_path, entry_filter)
+        if cmd:
+            return ExtractWorker(cmd)
+        return PkgExtractWorker(pkg_path, save_dir, entry_filter)
+
     # ------------------------- 提取回调 -------------------------
 
     def on_extract_finished(self, button):
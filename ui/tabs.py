@@ -6,10 +6,16 @@ UI标签页模块
 import os
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QPushButton, QLineEdit,
-    QHBoxLayout, QGridLayout, QScrollArea, QFrame, QFileDialog
+    QHBoxLayout, QFrame, QFileDialog, QSpinBox, QComboBox, QCheckBox
 )
 from PyQt6.QtCore import Qt
 
+from ui.wallpaper_grid import WallpaperListModel, WallpaperGridView
+from utils.facets import FACETS
+from utils.sort_index import SORT_KEYS
+from utils.batch_extract import default_batch_workers
+from utils.file_placement import PLACEMENT_STRATEGIES
+
 
 class TabCreator:
     """标签页创建器"""
@@ -48,20 +54,48 @@ class TabCreator:
         searchLayout = QHBoxLayout()
         searchLayout.addWidget(QLabel("搜索"))
         self.parent.searchEdit = QLineEdit()
-        self.parent.searchEdit.setPlaceholderText("输入壁纸标题搜索")
+        self.parent.searchEdit.setPlaceholderText("搜索标题、标签、类型、简介或创意工坊ID")
         self.parent.searchEdit.textChanged.connect(self.parent.search_wallpapers)
         searchLayout.addWidget(self.parent.searchEdit)
+        searchLayout.addWidget(QLabel("排序"))
+        self.parent.sortCombo = QComboBox()
+        self.parent.sortCombo.addItem("默认", None)
+        for key, label in SORT_KEYS.items():
+            self.parent.sortCombo.addItem(label, key)
+        searchLayout.addWidget(self.parent.sortCombo)
+        self.parent.sortDescendingCheck = QCheckBox("降序")
+        searchLayout.addWidget(self.parent.sortDescendingCheck)
         layout.addLayout(searchLayout)
 
+        # 分面筛选（扫描完成、索引就绪后可用）
+        filterLayout = QHBoxLayout()
+        self.parent.filterCombos = {}
+        for facet, label in FACETS.items():
+            filterLayout.addWidget(QLabel(label))
+            combo = QComboBox()
+            combo.addItem("全部", None)
+            combo.setEnabled(False)
+            combo.currentIndexChanged.connect(self.parent.on_filter_changed)
+            filterLayout.addWidget(combo, 1)
+            self.parent.filterCombos[facet] = combo
+        layout.addLayout(filterLayout)
+
         # 主内容区域
         mainContent = QHBoxLayout()
 
-        # 缩略图区域
-        thumbArea = QScrollArea()
-        thumbArea.setWidgetResizable(True)
-        thumbContainer = QWidget()
-        self.parent.thumbnailLayout = QGridLayout(thumbContainer)
-        thumbArea.setWidget(thumbContainer)
+        # 缩略图区域（虚拟化网格，只绘制可见单元格）
+        self.parent.wallpaperModel = WallpaperListModel(
+            self.parent.thumbnail_cache, self.parent.memory_cache, self.parent)
+        self.parent.thumbnailView = WallpaperGridView()
+        self.parent.thumbnailView.setModel(self.parent.wallpaperModel)
+        self.parent.thumbnailView.clicked.connect(self.parent.on_thumbnail_clicked)
+        self.parent.thumbnailView.entered.connect(self.parent.on_thumbnail_hovered)
+        self.parent.thumbnailView.selectionModel().currentChanged.connect(
+            self.parent.on_current_thumbnail_changed)
+        self.parent.thumbnailView.verticalScrollBar().valueChanged.connect(
+            self.parent.schedule_viewport_update)
+        self.parent.thumbnailView.verticalScrollBar().rangeChanged.connect(
+            self.parent.schedule_viewport_update)
 
         # 右侧预览区
         rightPanel = QWidget()
@@ -84,17 +118,6 @@ class TabCreator:
         self.parent.pathLabel.setAlignment(Qt.AlignmentFlag.AlignCenter)
         rightLayout.addWidget(self.parent.pathLabel)
 
-        # 添加分页控件
-        pageLayout = QHBoxLayout()
-        self.parent.prevBtn = QPushButton("上一页")
-        self.parent.prevBtn.clicked.connect(self.parent.go_to_previous_page)
-        self.parent.nextBtn = QPushButton("下一页")
-        self.parent.nextBtn.clicked.connect(self.parent.go_to_next_page)
-        
-        pageLayout.addWidget(self.parent.prevBtn)
-        pageLayout.addWidget(self.parent.nextBtn)
-        rightLayout.addLayout(pageLayout)
-
         # 添加按钮组
         extractAndOrganizeBtn = QPushButton("提取并整理")
         extractAndOrganizeBtn.clicked.connect(self.parent.extract_and_organize_files)
@@ -110,7 +133,7 @@ class TabCreator:
 
         rightLayout.addStretch(1)
 
-        mainContent.addWidget(thumbArea, 7)
+        mainContent.addWidget(self.parent.thumbnailView, 7)
         mainContent.addWidget(rightPanel, 2)
         layout.addLayout(mainContent)
         return tab
@@ -120,6 +143,17 @@ class TabCreator:
         tab = QWidget()
         layout = QVBoxLayout(tab)
 
+        # 提取内容（单个和批量提取共用）
+        filterLayout = QHBoxLayout()
+        filterLayout.addWidget(QLabel("提取内容:"))
+        self.parent.extractFilterCombo = QComboBox()
+        self.parent.extractFilterCombo.addItem("全部文件", None)
+        self.parent.extractFilterCombo.addItem("仅图片（纹理转换为图片）", "images")
+        self.parent.extractFilterCombo.addItem("仅纹理", "textures")
+        filterLayout.addWidget(self.parent.extractFilterCombo)
+        filterLayout.addStretch()
+        layout.addLayout(filterLayout)
+
         # 单个提取卡片
         singleCard = QFrame()
         singleCard.setFrameStyle(QFrame.Shape.Box)
@@ -156,9 +190,20 @@ class TabCreator:
         bLayout.addWidget(self.parent.batchPathEdit)
         bLayout.addWidget(browseBatch)
         batchLayout.addLayout(bLayout)
-        batchBtn = QPushButton("开始批量提取")
-        batchBtn.clicked.connect(self.parent.batch_extract)
-        batchLayout.addWidget(batchBtn)
+        workersLayout = QHBoxLayout()
+        workersLayout.addWidget(QLabel("并行数:"))
+        self.parent.batchWorkersSpin = QSpinBox()
+        self.parent.batchWorkersSpin.setRange(0, 64)
+        self.parent.batchWorkersSpin.setSpecialValueText(f"自动 ({default_batch_workers()})")
+        workersLayout.addWidget(self.parent.batchWorkersSpin)
+        workersLayout.addStretch()
+        batchLayout.addLayout(workersLayout)
+        self.parent.batchBtn = QPushButton("开始批量提取")
+        self.parent.batchBtn.clicked.connect(self.parent.batch_extract)
+        batchLayout.addWidget(self.parent.batchBtn)
+        self.parent.batchStatusLabel = QLabel("")
+        self.parent.batchStatusLabel.setStyleSheet("color: gray;")
+        batchLayout.addWidget(self.parent.batchStatusLabel)
 
         layout.addWidget(singleCard)
         layout.addWidget(batchCard)
@@ -194,6 +239,30 @@ class TabCreator:
         colorLayout.addWidget(self.parent.colorButton)
         settingsLayout.addLayout(colorLayout)
         
+        # 添加缩略图缓存设置
+        cacheLayout = QHBoxLayout()
+        cacheLayout.addWidget(QLabel("缩略图缓存上限:"))
+        self.parent.cacheSizeSpin = QSpinBox()
+        self.parent.cacheSizeSpin.setRange(0, 10240)
+        self.parent.cacheSizeSpin.setSuffix(" MB")
+        # 输入完成（回车或失去焦点）后才应用，避免输入"512"的过程中按5MB淘汰缓存
+        self.parent.cacheSizeSpin.setKeyboardTracking(False)
+        cacheLayout.addWidget(self.parent.cacheSizeSpin)
+        clearCacheBtn = QPushButton("清空缓存")
+        clearCacheBtn.clicked.connect(self.parent.clear_thumbnail_cache)
+        cacheLayout.addWidget(clearCacheBtn)
+        settingsLayout.addLayout(cacheLayout)
+
+        # 添加文件放置方式（复制mp4等文件时使用）
+        placementLayout = QHBoxLayout()
+        placementLayout.addWidget(QLabel("文件放置方式:"))
+        self.parent.placementCombo = QComboBox()
+        for strategy, (label, _) in PLACEMENT_STRATEGIES.items():
+            self.parent.placementCombo.addItem(label, strategy)
+        self.parent.placementCombo.setToolTip("硬链接与创意工坊中的原文件共享数据，修改其中一个会影响另一个")
+        placementLayout.addWidget(self.parent.placementCombo)
+        settingsLayout.addLayout(placementLayout)
+        
         # 添加版本检查组
         versionGroup = QFrame()
         versionGroup.setFrameStyle(QFrame.Shape.Box)
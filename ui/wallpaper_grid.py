@@ -0,0 +1,216 @@
+"""
+壁纸网格模块
+基于QAbstractListModel + QListView的虚拟化缩略图网格，只绘制可见单元格并按需加载缩略图
+"""
+
+import os
+from PyQt6.QtWidgets import QListView, QStyledItemDelegate, QStyle
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QSize, QRect
+from PyQt6.QtGui import QPixmap, QPixmapCache, QColor
+
+from utils.thumbnails import THUMBNAIL_SIZE
+from utils.workers import (
+    ThumbnailScheduler, PRIORITY_VISIBLE, PRIORITY_SELECTED, PRIORITY_PREFETCH, PRIORITY_IDLE
+)
+
+
+PathRole = Qt.ItemDataRole.UserRole + 1
+
+CELL_MARGIN = 3
+CELL_SIZE = THUMBNAIL_SIZE + CELL_MARGIN * 2
+GRID_SPACING = 6
+
+# 可见区域上下各预取一屏，再往外的若干屏在空闲时预热
+PREFETCH_SCREENS = 1
+IDLE_SCREENS = 3
+
+
+class WallpaperListModel(QAbstractListModel):
+    """壁纸列表模型
+
+    只保存预览图路径；缩略图在视图绘制某一行时以可见优先级请求，
+    视口移动后由set_viewport()按 可见 > 悬停/选中 > 预取 > 空闲预热 重新排定加载顺序。
+    结果放入QPixmapCache并通过dataChanged通知视图重绘对应单元格。
+    """
+
+    def __init__(self, cache=None, memory_cache=None, parent=None):
+        super().__init__(parent)
+        self.paths = []
+        self.memory_cache = memory_cache
+        self.focus_row = -1  # 悬停或选中的行
+        self._failed = set()
+        self.scheduler = ThumbnailScheduler(cache, memory_cache)
+        self.scheduler.imageLoaded.connect(self._on_image_loaded)
+
+    @property
+    def generation(self):
+        return self.scheduler.generation
+
+    # ------------------------- 模型接口 -------------------------
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.paths)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.paths):
+            return None
+        path = self.paths[index.row()]
+        if role == Qt.ItemDataRole.DecorationRole:
+            return self.thumbnail(index.row())
+        if role == PathRole:
+            return path
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return f"ID: {os.path.basename(os.path.dirname(path))}"
+        return None
+
+    # ------------------------- 数据更新 -------------------------
+
+    def set_paths(self, paths):
+        """替换整个列表，进行中的加载全部作废"""
+        self.beginResetModel()
+        self.scheduler.reset()
+        self.paths = list(paths)
+        self.focus_row = -1
+        self.endResetModel()
+
+    def append_paths(self, paths):
+        """在末尾追加条目（扫描过程中流式加入）"""
+        if not paths:
+            return
+        start = len(self.paths)
+        self.beginInsertRows(QModelIndex(), start, start + len(paths) - 1)
+        self.paths.extend(paths)
+        self.endInsertRows()
+
+    # ------------------------- 缩略图 -------------------------
+
+    @staticmethod
+    def _pixmap_key(path):
+        return f"thumb:{path}"
+
+    def thumbnail(self, row):
+        """返回该行的缩略图，尚未加载时以可见优先级发起加载并返回None"""
+        path = self.paths[row]
+        pixmap = self._cached_pixmap(path)
+        if pixmap is None and path not in self._failed:
+            self.scheduler.request(row, path, PRIORITY_VISIBLE)
+        return pixmap
+
+    def _cached_pixmap(self, path):
+        pixmap = QPixmapCache.find(self._pixmap_key(path))
+        if pixmap is not None:
+            return pixmap
+        if self.memory_cache is not None:
+            image = self.memory_cache.get(path, THUMBNAIL_SIZE)
+            if image is not None:
+                pixmap = QPixmap.fromImage(image)
+                QPixmapCache.insert(self._pixmap_key(path), pixmap)
+                return pixmap
+        return None
+
+    def _needs_load(self, path):
+        if path in self._failed:
+            return False
+        if QPixmapCache.find(self._pixmap_key(path)) is not None:
+            return False
+        return self.memory_cache is None or (path, THUMBNAIL_SIZE) not in self.memory_cache
+
+    def is_failed(self, row):
+        """该行缩略图是否加载失败"""
+        return 0 <= row < len(self.paths) and self.paths[row] in self._failed
+
+    def set_focus_row(self, row):
+        """标记悬停或选中的行，其缩略图排在可见单元格之后优先加载"""
+        self.focus_row = row
+        if 0 <= row < len(self.paths) and self._needs_load(self.paths[row]):
+            self.scheduler.request(row, self.paths[row], PRIORITY_SELECTED)
+
+    def set_viewport(self, first, last):
+        """视口移动后重新排定加载顺序：可见 > 悬停/选中 > 预取 > 空闲预热，窗口外的请求丢弃"""
+        count = len(self.paths)
+        span = last - first + 1
+        ranges = [
+            (PRIORITY_VISIBLE, first, last + 1),
+            (PRIORITY_PREFETCH, last + 1, last + 1 + span * PREFETCH_SCREENS),
+            (PRIORITY_PREFETCH, first - span * PREFETCH_SCREENS, first),
+            (PRIORITY_IDLE, last + 1 + span * PREFETCH_SCREENS,
+             last + 1 + span * (PREFETCH_SCREENS + IDLE_SCREENS)),
+            (PRIORITY_IDLE, first - span * (PREFETCH_SCREENS + IDLE_SCREENS),
+             first - span * PREFETCH_SCREENS),
+        ]
+        requests = []
+        if 0 <= self.focus_row < count:
+            requests.append((self.focus_row, self.paths[self.focus_row], PRIORITY_SELECTED))
+        for priority, start, stop in ranges:
+            for row in range(max(0, start), min(count, stop)):
+                requests.append((row, self.paths[row], priority))
+        self.scheduler.set_window([r for r in requests if self._needs_load(r[1])])
+
+    def _on_image_loaded(self, generation, row, path, image):
+        if image is None:
+            self._failed.add(path)
+        else:
+            QPixmapCache.insert(self._pixmap_key(path), QPixmap.fromImage(image))
+        if row < len(self.paths) and self.paths[row] == path:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
+
+class ThumbnailDelegate(QStyledItemDelegate):
+    """缩略图单元格绘制：边框 + 居中的缩略图或状态文字"""
+
+    def sizeHint(self, option, index):
+        return QSize(CELL_SIZE, CELL_SIZE)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        rect = QRect(option.rect.topLeft(), QSize(CELL_SIZE, CELL_SIZE))
+        inner = rect.adjusted(CELL_MARGIN, CELL_MARGIN, -CELL_MARGIN, -CELL_MARGIN)
+
+        if option.state & QStyle.StateFlag.State_Selected:
+            painter.fillRect(rect, option.palette.highlight())
+
+        pixmap = index.data(Qt.ItemDataRole.DecorationRole)
+        if pixmap is not None and not pixmap.isNull():
+            x = inner.x() + (inner.width() - pixmap.width()) // 2
+            y = inner.y() + (inner.height() - pixmap.height()) // 2
+            painter.drawPixmap(x, y, pixmap)
+        else:
+            text = "加载失败" if index.model().is_failed(index.row()) else "加载中..."
+            painter.drawText(inner, Qt.AlignmentFlag.AlignCenter, text)
+
+        painter.setPen(QColor("gray"))
+        painter.drawRect(inner.adjusted(0, 0, -1, -1))
+        painter.restore()
+
+
+class WallpaperGridView(QListView):
+    """虚拟化的壁纸网格视图：固定单元格尺寸，平滑滚动"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setViewMode(QListView.ViewMode.IconMode)
+        self.setMovement(QListView.Movement.Static)
+        self.setResizeMode(QListView.ResizeMode.Adjust)
+        self.setUniformItemSizes(True)
+        self.setGridSize(QSize(CELL_SIZE + GRID_SPACING, CELL_SIZE + GRID_SPACING))
+        self.setVerticalScrollMode(QListView.ScrollMode.ScrollPerPixel)
+        self.verticalScrollBar().setSingleStep(CELL_SIZE // 4)
+        self.setSelectionMode(QListView.SelectionMode.SingleSelection)
+        self.setLayoutMode(QListView.LayoutMode.Batched)
+        self.setBatchSize(500)
+        self.setItemDelegate(ThumbnailDelegate(self))
+        self.setMouseTracking(True)  # 悬停时发出entered信号
+
+    def visible_rows(self):
+        """返回当前可见的行范围 (first, last)，没有可见行时返回None"""
+        model = self.model()
+        if model is None or model.rowCount() == 0:
+            return None
+        # 网格固定、按像素滚动，直接由滚动位置计算；indexAt()落在单元格之间的空隙时会得到无效索引
+        grid = self.gridSize()
+        columns = max(1, self.viewport().width() // grid.width())
+        first = min(model.rowCount() - 1, self.verticalScrollBar().value() // grid.height() * columns)
+        rows = self.viewport().height() // grid.height() + 2
+        last = min(model.rowCount() - 1, first + columns * rows - 1)
+        return first, last
@@ -0,0 +1,317 @@
+"""
+批量提取模块
+找出目录下的所有壁纸，在有界的进程池中并行提取，并统计吞吐量
+"""
+
+import os
+import time
+import shutil
+import tempfile
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from utils.file_operations import FileOperations
+from utils.file_placement import DEFAULT_PLACEMENT_STRATEGY
+
+
+# 自动并行数的上限：再多时瓶颈在磁盘而不是CPU
+MAX_BATCH_WORKERS = 8
+
+# 使用RePKG.exe时每次调用最多提取的PKG数（1表示逐个调用）
+REPKG_GROUP_SIZE = 64
+
+
+def default_batch_workers():
+    """默认并行数：CPU核数，最多MAX_BATCH_WORKERS"""
+    return max(1, min(os.cpu_count() or 1, MAX_BATCH_WORKERS))
+
+
+class BatchItem:
+    """一个待提取的壁纸"""
+
+    __slots__ = ("source", "save_dir", "size")
+
+    def __init__(self, source, save_dir, size):
+        self.source = source      # scene.pkg或mp4
+        self.save_dir = save_dir  # 输出目录
+        self.size = size          # 源文件字节数
+
+    def __repr__(self):
+        return f"BatchItem({self.source!r})"
+
+
+def find_batch_items(directory, save_root):
+    """遍历目录，返回所有可提取的壁纸（每个目录优先scene.pkg，其次mp4）
+
+    每个壁纸输出到 save_root/<壁纸目录名>，重名时追加序号；找到壁纸的目录不再进入其子目录。
+    """
+    items = []
+    used_names = set()
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        target = None
+        if "scene.pkg" in files:
+            target = "scene.pkg"
+        else:
+            mp4_files = sorted(f for f in files if f.lower().endswith('.mp4'))
+            if mp4_files:
+                target = mp4_files[0]
+        if not target:
+            continue
+        dirs[:] = []
+
+        source = os.path.join(root, target)
+        try:
+            size = os.path.getsize(source)
+        except OSError as e:
+            print(f"读取文件失败 ({source}): {e}")
+            continue
+
+        base_name = os.path.basename(os.path.normpath(root))
+        name = base_name
+        counter = 1
+        while name in used_names:
+            name = f"{base_name}_{counter}"
+            counter += 1
+        used_names.add(name)
+        items.append(BatchItem(source, os.path.join(save_root, name), size))
+    return items
+
+
+def extract_batch_item(source, save_dir, repkg_path=None, entry_filter=None,
+                       placement_strategy=DEFAULT_PLACEMENT_STRATEGY):
+    """在工作进程中提取一个壁纸：PKG优先用RePKG.exe，否则用内置解析器；mp4按放置策略复制"""
+    os.makedirs(save_dir, exist_ok=True)
+    if source.lower().endswith('.pkg'):
+        cmd = FileOperations.get_extract_command(source, save_dir, repkg_path, entry_filter)
+        if cmd:
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            if result.returncode != 0:
+                raise RuntimeError(result.stderr.strip() or f"RePKG退出码 {result.returncode}")
+        else:
+            FileOperations.extract_pkg(source, save_dir, entry_filter=entry_filter)
+    elif not FileOperations.copy_file_to_directory(source, save_dir, placement_strategy):
+        raise OSError(f"复制失败: {source}")
+
+
+def _link(source, target):
+    """把源文件链接到target：优先硬链接，其次符号链接，都不行时返回False（不复制）"""
+    try:
+        os.link(source, target)
+        return True
+    except OSError:
+        pass
+    try:
+        os.symlink(source, target)
+        return True
+    except OSError:
+        return False
+
+
+def _extract_each(entries, repkg_path, entry_filter):
+    """逐个提取，返回与entries对应的错误信息列表"""
+    errors = []
+    for source, save_dir in entries:
+        try:
+            extract_batch_item(source, save_dir, repkg_path, entry_filter)
+            errors.append(None)
+        except Exception as e:
+            errors.append(str(e))
+    return errors
+
+
+def _move_contents(source_dir, target_dir):
+    """把source_dir下的内容移动到target_dir（已存在的同名文件被覆盖，同名目录合并）"""
+    os.makedirs(target_dir, exist_ok=True)
+    for name in os.listdir(source_dir):
+        source = os.path.join(source_dir, name)
+        target = os.path.join(target_dir, name)
+        if os.path.isdir(source) and os.path.isdir(target):
+            _move_contents(source, target)
+        else:
+            if os.path.isdir(target):
+                shutil.rmtree(target)
+            shutil.move(source, target)
+
+
+def extract_repkg_group(entries, repkg_path, entry_filter=None):
+    """在工作进程中用一次RePKG调用提取多个PKG，返回与entries对应的错误信息列表（成功为None）
+
+    entries为[(源PKG, 输出目录)]。各PKG以 <编号>/scene.pkg 的形式链接到临时目录，
+    RePKG递归提取时按所在文件夹名输出到 <编号>/ 下，再按编号移动回各自的输出目录。
+    临时目录建在第一个输出目录的上级目录中，移动结果时通常只是重命名。
+    无法链接的PKG（例如跨分区且没有创建符号链接的权限）不复制，改为单独提取；
+    RePKG整组失败时无法确定哪些输出是完整的，整组改为逐个提取，错误信息对应到具体的壁纸。
+    """
+    staging_root = os.path.dirname(os.path.normpath(entries[0][1]))
+    os.makedirs(staging_root, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".repkg-", dir=staging_root)
+    try:
+        input_dir = os.path.join(staging, "in")
+        output_dir = os.path.join(staging, "out")
+        os.makedirs(output_dir)
+        linked, unlinked = [], []  # entries中的编号
+        for i, (source, _) in enumerate(entries):
+            item_dir = os.path.join(input_dir, str(i))
+            os.makedirs(item_dir)
+            if _link(source, os.path.join(item_dir, os.path.basename(source))):
+                linked.append(i)
+            else:
+                unlinked.append(i)
+
+        errors = [None] * len(entries)
+        for i, error in zip(unlinked, _extract_each([entries[i] for i in unlinked], repkg_path, entry_filter)):
+            errors[i] = error
+        if not linked:
+            return errors
+
+        cmd = FileOperations.get_recursive_extract_command(input_dir, output_dir, repkg_path, entry_filter)
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            message = result.stderr.strip() or f"退出码 {result.returncode}"
+            print(f"RePKG分组提取失败，改为逐个提取: {message}")
+            for i, error in zip(linked, _extract_each([entries[i] for i in linked], repkg_path, entry_filter)):
+                errors[i] = error
+            return errors
+
+        for i in linked:
+            item_output = os.path.join(output_dir, str(i))
+            if os.path.isdir(item_output):
+                _move_contents(item_output, entries[i][1])
+            else:
+                errors[i] = "RePKG未输出任何文件"
+        return errors
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+class BatchProgress:
+    """批量提取的进度和吞吐量"""
+
+    def __init__(self, total, total_bytes):
+        self.total = total
+        self.total_bytes = total_bytes
+        self.done = 0
+        self.failed = 0
+        self.bytes_done = 0
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+
+    def add(self, item, error=None):
+        """记录一个壁纸完成（error不为None时计为失败）"""
+        self.done += 1
+        self.bytes_done += item.size
+        if error is not None:
+            self.failed += 1
+        self.elapsed = time.monotonic() - self.started
+
+    @property
+    def items_per_second(self):
+        return self.done / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def mb_per_second(self):
+        return self.bytes_done / (1024 * 1024) / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self):
+        """进度文字"""
+        text = (f"{self.done}/{self.total}，{self.items_per_second:.1f} 个/秒，"
+                f"{self.mb_per_second:.1f} MB/秒")
+        if self.failed:
+            text += f"，{self.failed} 个失败"
+        return text
+
+
+class BatchExtractor:
+    """批量提取引擎
+
+    在进程池中并行提取（纹理解码等是CPU密集的纯Python/NumPy代码，线程受GIL限制）。
+    同时提交的任务数有上限，取消时未开始的任务立即放弃，正在提取的任务等待其完成。
+    工作进程用spawn方式启动，不继承界面进程中Qt的线程状态。
+    使用RePKG.exe时PKG按组提交，每组只启动一次RePKG（省去逐个启动.NET运行时的开销）。
+    """
+
+    # 每个工作进程最多排队的任务数，保证进程切换任务时不空等
+    QUEUE_PER_WORKER = 2
+
+    def __init__(self, items, max_workers=None, repkg_path=None, group_size=REPKG_GROUP_SIZE,
+                 entry_filter=None, placement_strategy=DEFAULT_PLACEMENT_STRATEGY):
+        self.items = list(items)
+        self.max_workers = max_workers or default_batch_workers()
+        self.repkg_path = repkg_path
+        self.group_size = max(1, group_size)
+        self.entry_filter = entry_filter
+        self.placement_strategy = placement_strategy
+        self.progress = BatchProgress(len(self.items), sum(item.size for item in self.items))
+        self._cancelled = False
+
+    def cancel(self):
+        """请求停止（已提交给工作进程的任务会完成）"""
+        self._cancelled = True
+
+    def _tasks(self, workers):
+        """把壁纸划分为任务：每个任务是一组壁纸
+
+        不使用RePKG.exe时每个壁纸一个任务；使用时PKG分组，组的大小同时保证每个工作进程都有任务。
+        """
+        grouped = (self.repkg_path and self.group_size > 1
+                   and FileOperations.repkg_filter_args(self.entry_filter) is not None)
+        if not grouped:
+            return [[item] for item in self.items]
+        packages = [item for item in self.items if item.source.lower().endswith('.pkg')]
+        others = [[item] for item in self.items if not item.source.lower().endswith('.pkg')]
+        size = min(self.group_size, -(-len(packages) // workers)) if packages else 1
+        return [packages[i:i + size] for i in range(0, len(packages), size)] + others
+
+    def _submit(self, pool, task):
+        if len(task) > 1:
+            entries = [(item.source, item.save_dir) for item in task]
+            return pool.submit(extract_repkg_group, entries, self.repkg_path, self.entry_filter)
+        item = task[0]
+        return pool.submit(extract_batch_item, item.source, item.save_dir, self.repkg_path,
+                           self.entry_filter, self.placement_strategy)
+
+    def run(self, on_progress=None):
+        """执行批量提取，返回BatchProgress；on_progress(progress) 每完成一个任务调用一次"""
+        progress = self.progress
+        progress.started = time.monotonic()
+        if not self.items:
+            return progress
+
+        workers = min(self.max_workers, len(self.items))
+        limit = workers * self.QUEUE_PER_WORKER
+        pending = {}
+        queue = iter(self._tasks(workers))
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            while True:
+                while not self._cancelled and len(pending) < limit:
+                    task = next(queue, None)
+                    if task is None:
+                        break
+                    pending[self._submit(pool, task)] = task
+                if not pending:
+                    break
+
+                completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    task = pending.pop(future)
+                    if future.cancelled():
+                        continue
+                    error = future.exception()
+                    if len(task) > 1 and error is None:
+                        errors = future.result()
+                    else:
+                        errors = [error and str(error)] * len(task)
+                    for item, item_error in zip(task, errors):
+                        if item_error is not None:
+                            print(f"提取失败 ({item.source}): {item_error}")
+                        progress.add(item, item_error)
+                    if on_progress:
+                        on_progress(progress)
+
+                if self._cancelled:
+                    for future in pending:
+                        future.cancel()
+        return progress
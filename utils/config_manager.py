@@ -21,6 +21,14 @@ class ConfigManager:
         """获取配置文件路径"""
         return os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "config.json")
 
+    def get_library_index_path(self):
+        """获取壁纸库索引数据库路径（与配置文件同目录）"""
+        return os.path.join(os.path.dirname(self.config_path), "library.db")
+
+    def get_thumbnail_cache_dir(self):
+        """获取缩略图磁盘缓存目录（与配置文件同目录）"""
+        return os.path.join(os.path.dirname(self.config_path), "thumbnail_cache")
+
     def load_config(self):
         """加载配置文件"""
         if os.path.exists(self.config_path):
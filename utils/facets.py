@@ -0,0 +1,112 @@
+"""
+分面筛选模块
+为类型、内容分级、标签、包含的文件和文件大小区间预先计算NumPy布尔数组，任意筛选组合只需几次向量化与/或运算
+"""
+
+import numpy as np
+
+
+MB = 1024 * 1024
+
+# 文件大小区间：(名称, 下限, 上限)，左闭右开
+SIZE_BUCKETS = (
+    ("< 10 MB", 0, 10 * MB),
+    ("10 - 100 MB", 10 * MB, 100 * MB),
+    ("100 - 500 MB", 100 * MB, 500 * MB),
+    ("> 500 MB", 500 * MB, None),
+)
+
+# 分面名称 -> 显示名称
+FACETS = {
+    "type": "类型",
+    "content_rating": "分级",
+    "tags": "标签",
+    "contents": "包含",
+    "size": "大小",
+}
+
+CONTENT_SCENE_PKG = "scene.pkg"
+CONTENT_MP4 = "mp4"
+
+
+class FacetIndex:
+    """分面筛选索引（构建后只读）
+
+    每个分面的每个取值对应一个长度为条目数的布尔数组。
+    同一分面内选中的多个取值取"或"，不同分面之间取"与"。
+    """
+
+    def __init__(self, records):
+        self.keys = [record["preview"] for record in records]
+        self.positions = {key: i for i, key in enumerate(self.keys)}
+        count = len(self.keys)
+        self.facets = {facet: {} for facet in FACETS}
+
+        def mark(facet, value, i):
+            if not value:
+                return
+            values = self.facets[facet]
+            if value not in values:
+                values[value] = np.zeros(count, dtype=bool)
+            values[value][i] = True
+
+        sizes = np.zeros(count, dtype=np.int64)
+        for i, record in enumerate(records):
+            mark("type", record.get("type"), i)
+            mark("content_rating", record.get("content_rating"), i)
+            for tag in record.get("tags") or ():
+                mark("tags", tag, i)
+            if record.get("has_scene_pkg"):
+                mark("contents", CONTENT_SCENE_PKG, i)
+            if record.get("has_mp4"):
+                mark("contents", CONTENT_MP4, i)
+            sizes[i] = record.get("file_size") or 0
+
+        # 大小区间直接由大小数组向量化计算
+        for name, low, high in SIZE_BUCKETS:
+            in_bucket = sizes >= low
+            if high is not None:
+                in_bucket &= sizes < high
+            if in_bucket.any():
+                self.facets["size"][name] = in_bucket
+
+    def __len__(self):
+        return len(self.keys)
+
+    def values(self, facet):
+        """返回分面的所有取值（大小区间按从小到大，其余按名称排序）"""
+        values = self.facets[facet]
+        if facet == "size":
+            return [name for name, _, _ in SIZE_BUCKETS if name in values]
+        return sorted(values, key=str.casefold)
+
+    def mask(self, selection, skip=None):
+        """返回满足筛选条件的布尔数组
+
+        selection为 {分面: 选中的取值集合}，空集合表示该分面不筛选；skip指定的分面不参与计算。
+        """
+        result = np.ones(len(self.keys), dtype=bool)
+        for facet, selected in selection.items():
+            if facet == skip or not selected:
+                continue
+            values = self.facets.get(facet, {})
+            facet_mask = np.zeros(len(self.keys), dtype=bool)
+            for value in selected:
+                if value in values:
+                    facet_mask |= values[value]
+            result &= facet_mask
+        return result
+
+    def counts(self, facet, selection):
+        """返回该分面各取值在其他分面筛选条件下的条目数"""
+        base = self.mask(selection, skip=facet)
+        return {value: int(np.count_nonzero(base & array))
+                for value, array in self.facets[facet].items()}
+
+    def filter(self, selection, keys=None):
+        """返回满足筛选条件的条目键，keys给出时按keys的顺序过滤（例如搜索结果）"""
+        mask = self.mask(selection)
+        if keys is None:
+            return [self.keys[i] for i in np.flatnonzero(mask).tolist()]
+        positions = self.positions
+        return [key for key in keys if key in positions and mask[positions[key]]]
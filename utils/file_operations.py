@@ -5,12 +5,21 @@
 
 import os
 import sys
-import json
 import glob
+import json
 import shutil
 import re
 import subprocess
 
+from utils.pkg_reader import PkgReader
+from utils.tex_decoder import convert_tex
+from utils.metadata import get_metadata_cache
+from utils.file_placement import place_file, DEFAULT_PLACEMENT_STRATEGY
+
+
+# 整理完成后写入壁纸文件夹的清单
+ORGANIZED_MANIFEST = ".organized.json"
+
 
 class FileOperations:
     """文件操作工具类"""
@@ -18,6 +27,10 @@ class FileOperations:
     @staticmethod
     def find_repkg_exe():
         """查找RePKG.exe的位置"""
+        # RePKG.exe 只能在Windows上运行，其他平台使用内置PKG解析器
+        if sys.platform != "win32":
+            return None
+
         # 首先在程序所在目录查找
         if getattr(sys, 'frozen', False):
             # 如果是打包后的程序
@@ -33,74 +46,139 @@ class FileOperations:
         return None
     
     @staticmethod
-    def get_extract_command(file_path, save_directory, repkg_path):
-        """获取提取命令"""
+    def repkg_filter_args(entry_filter):
+        """把条目筛选条件转换为RePKG参数；RePKG只能按扩展名筛选，无法表达时返回None"""
+        if entry_filter is None:
+            return []
+        extensions = entry_filter.extensions()
+        if extensions is None:
+            return None
+        return ["--onlyexts", ",".join(extensions)]
+
+    @staticmethod
+    def get_extract_command(file_path, save_directory, repkg_path, entry_filter=None):
+        """获取提取命令（RePKG无法表达筛选条件时返回None，改用内置解析器）"""
         if file_path.endswith('.pkg'):
-            if not repkg_path:
+            filter_args = FileOperations.repkg_filter_args(entry_filter)
+            if not repkg_path or filter_args is None:
                 return None
-            return [repkg_path, "extract", file_path, "-o", save_directory]
+            return [repkg_path, "extract", file_path, "-o", save_directory] + filter_args
         elif file_path.endswith('.mp4') or file_path.endswith(('.jpg', '.jpeg', '.png')):
             return None
         return None
+
+    @staticmethod
+    def get_recursive_extract_command(input_directory, save_directory, repkg_path, entry_filter=None):
+        """获取递归提取命令：一次RePKG调用提取目录下所有PKG，每个PKG输出到以其所在文件夹命名的子目录"""
+        filter_args = FileOperations.repkg_filter_args(entry_filter)
+        if not repkg_path or filter_args is None:
+            return None
+        return [repkg_path, "extract", "-r", input_directory, "-o", save_directory] + filter_args
     
     @staticmethod
-    def organize_extracted_files(save_dir):
-        """整理提取后的文件"""
-        if not save_dir:
-            return
-            
-        # 遍历保存目录下的所有文件夹
-        for item in os.listdir(save_dir):
-            item_path = os.path.join(save_dir, item)
-            if not os.path.isdir(item_path):
-                continue
-                
-            materials_dir = os.path.join(item_path, "materials")
-            if not os.path.exists(materials_dir):
-                continue
-                
-            # 获取materials文件夹中的所有图片文件
-            for root, _, files in os.walk(materials_dir):
-                for file in files:
-                    src_path = os.path.join(root, file)
-                    if file.lower().endswith(('.png', '.jpg', '.jpeg')):
-                        dst_path = os.path.join(item_path, file)
-                        base_name, ext = os.path.splitext(dst_path)
-                        counter = 1
-                        while os.path.exists(dst_path):
-                            dst_path = f"{base_name}_{counter}{ext}"
-                            counter += 1
-                        try:
-                            shutil.copy2(src_path, dst_path)
-                        except Exception as e:
-                            print(f"复制文件失败: {e}")
-            
-            # 删除materials文件夹和非图片文件
-            try:
-                shutil.rmtree(materials_dir)
-                for file in os.listdir(item_path):
-                    file_path = os.path.join(item_path, file)
-                    if not file.lower().endswith(('.png', '.jpg', '.jpeg')):
-                        if os.path.isfile(file_path):
-                            os.remove(file_path)
-                        elif os.path.isdir(file_path):
-                            shutil.rmtree(file_path)
-            except Exception as e:
-                print(f"清理文件失败: {e}")
+    def extract_pkg(pkg_path, save_directory, convert_textures=True, entry_filter=None):
+        """使用内置解析器提取PKG文件，返回写出的文件列表
+
+        convert_textures为True时，.tex纹理会额外转换为同名图片（与RePKG行为一致）；
+        entry_filter（EntryFilter）给出时先按条目表筛选，未选中条目的数据不会被读取或写出。
+        """
+        os.makedirs(save_directory, exist_ok=True)
+        textures_as_images = entry_filter is not None and entry_filter.textures_as_images
+        written = []
+        with PkgReader(pkg_path) as reader:
+            for entry in reader.select(entry_filter):
+                is_texture = entry.name.lower().endswith('.tex')
+                if is_texture and textures_as_images:
+                    dst_path = reader.entry_path(entry, save_directory)
+                else:
+                    dst_path = reader.extract_entry(entry, save_directory)
+                    written.append(dst_path)
+                if is_texture and (convert_textures or textures_as_images):
+                    data = reader.read(entry)
+                    try:
+                        image_path = FileOperations.save_tex_as_image(data, dst_path, textures_as_images)
+                    finally:
+                        data.release()
+                    if image_path:
+                        written.append(image_path)
+        return written
+
+    @staticmethod
+    def save_tex_as_image(data, tex_path, images_only=False):
+        """将TEX数据转换为图片并保存在tex_path旁，返回图片路径，失败返回None
+
+        images_only为True时跳过视频纹理（内嵌MP4），返回None。
+        """
+        try:
+            converted = convert_tex(data, images_only)
+        except Exception as e:
+            print(f"转换纹理失败 ({os.path.basename(tex_path)}): {e}")
+            return None
+        if converted is None:
+            return None
+        ext, image_bytes = converted
+        image_path = os.path.splitext(tex_path)[0] + ext
+        os.makedirs(os.path.dirname(image_path), exist_ok=True)
+        with open(image_path, 'wb') as f:
+            f.write(image_bytes)
+        return image_path
+
+    @staticmethod
+    def organize_item_directory(item_path):
+        """整理一个提取后的壁纸文件夹：materials中的图片移到文件夹下，删除其余文件
+
+        整理后写入清单ORGANIZED_MANIFEST（保留的图片列表）。
+        没有materials文件夹时不做任何事，返回False。
+        """
+        materials_dir = os.path.join(item_path, "materials")
+        if not os.path.isdir(materials_dir):
+            return False
+
+        # 获取materials文件夹中的所有图片文件
+        for root, _, files in os.walk(materials_dir):
+            for file in files:
+                src_path = os.path.join(root, file)
+                if file.lower().endswith(('.png', '.jpg', '.jpeg')):
+                    dst_path = os.path.join(item_path, file)
+                    base_name, ext = os.path.splitext(dst_path)
+                    counter = 1
+                    while os.path.exists(dst_path):
+                        dst_path = f"{base_name}_{counter}{ext}"
+                        counter += 1
+                    # 同一目录树内移动只是重命名，不再复制一遍数据
+                    try:
+                        shutil.move(src_path, dst_path)
+                    except Exception as e:
+                        print(f"移动文件失败: {e}")
+
+        # 删除materials文件夹和非图片文件
+        try:
+            shutil.rmtree(materials_dir)
+            for file in os.listdir(item_path):
+                file_path = os.path.join(item_path, file)
+                if not file.lower().endswith(('.png', '.jpg', '.jpeg')):
+                    if os.path.isfile(file_path):
+                        os.remove(file_path)
+                    elif os.path.isdir(file_path):
+                        shutil.rmtree(file_path)
+        except Exception as e:
+            print(f"清理文件失败: {e}")
+
+        try:
+            files = sorted(os.listdir(item_path))
+            with open(os.path.join(item_path, ORGANIZED_MANIFEST), 'w', encoding='utf-8') as f:
+                json.dump({"files": files}, f, ensure_ascii=False, indent=4)
+        except OSError as e:
+            print(f"写入整理清单失败: {e}")
+        return True
     
     @staticmethod
     def get_title_from_project_json(parent_path):
-        """从project.json获取标题"""
-        pj = os.path.join(parent_path, "project.json")
-        title = "Untitled"
-        if os.path.exists(pj):
-            try:
-                with open(pj, 'r', encoding='utf-8') as f:
-                    title = json.load(f).get("title", "Untitled")
-                    title = re.sub(r'[<>:"/\\|?*]', '', title) or "Untitled"
-            except:
-                pass
-        return title
+        """从project.json获取标题（经由共享的元数据缓存）"""
+        metadata = get_metadata_cache().get(parent_path)
+        if metadata is None or not metadata.title:
+            return "Untitled"
+        return re.sub(r'[<>:"/\\|?*]', '', metadata.title) or "Untitled"
     
     @staticmethod
     def find_target_file(parent_path):
@@ -122,12 +200,12 @@ class FileOperations:
         return target
     
     @staticmethod
-    def copy_file_to_directory(source_file, target_directory):
-        """复制文件到目录"""
+    def copy_file_to_directory(source_file, target_directory, strategy=DEFAULT_PLACEMENT_STRATEGY):
+        """复制文件到目录（按放置策略优先克隆或硬链接，见file_placement）"""
         try:
             filename = os.path.basename(source_file)
             target_path = os.path.join(target_directory, filename)
-            shutil.copy2(source_file, target_path)
+            place_file(source_file, target_path, strategy)
             return True
         except Exception as e:
             print(f"复制失败: {e}")
@@ -0,0 +1,133 @@
+"""
+文件放置模块
+把文件放到目标位置时按策略依次尝试：reflink克隆 -> 硬链接 -> 内核内复制（copy_file_range/sendfile）-> 缓冲复制
+"""
+
+import os
+import sys
+import errno
+import shutil
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+# Linux的FICLONE ioctl：在支持写时复制的文件系统（btrfs、XFS等）上共享数据块
+FICLONE = 0x40049409
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+METHOD_REFLINK = "reflink"
+METHOD_HARDLINK = "hardlink"
+METHOD_KERNEL = "kernel"
+METHOD_BUFFERED = "buffered"
+
+# 放置策略 -> (显示名称, 依次尝试的方式)
+PLACEMENT_STRATEGIES = {
+    "auto": ("自动（克隆 > 硬链接 > 复制）",
+             (METHOD_REFLINK, METHOD_HARDLINK, METHOD_KERNEL, METHOD_BUFFERED)),
+    "clone": ("独立副本（克隆 > 复制，不使用硬链接）",
+              (METHOD_REFLINK, METHOD_KERNEL, METHOD_BUFFERED)),
+    "copy": ("复制", (METHOD_KERNEL, METHOD_BUFFERED)),
+}
+DEFAULT_PLACEMENT_STRATEGY = "auto"
+
+
+def _unsupported(method):
+    return OSError(errno.EOPNOTSUPP, f"不支持{method}")
+
+
+def _reflink(source, target):
+    if fcntl is None or not sys.platform.startswith("linux"):
+        raise _unsupported(METHOD_REFLINK)
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+
+def _hardlink(source, target):
+    # 不同文件系统之间无法硬链接，先比较设备号省去一次失败的系统调用
+    if os.stat(source).st_dev != os.stat(os.path.dirname(os.path.abspath(target))).st_dev:
+        raise OSError(errno.EXDEV, "源文件和目标不在同一文件系统")
+    os.link(source, target)
+
+
+def _kernel_copy(source, target):
+    copy_file_range = getattr(os, "copy_file_range", None)
+    sendfile = getattr(os, "sendfile", None) if sys.platform.startswith("linux") else None
+    if copy_file_range is None and sendfile is None:
+        raise _unsupported(METHOD_KERNEL)
+
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        size = os.fstat(src.fileno()).st_size
+        offset = 0
+        if copy_file_range is not None:
+            try:
+                while offset < size:
+                    copied = copy_file_range(src.fileno(), dst.fileno(), size - offset)
+                    if copied == 0:
+                        # 一开始就返回0（procfs等虚拟文件系统、部分网络文件系统）视为不支持，与shutil一致
+                        if offset == 0:
+                            raise _unsupported("copy_file_range")
+                        break
+                    offset += copied
+            except OSError:
+                # 部分文件系统或跨文件系统时不支持，尚未复制任何数据时改用sendfile
+                if offset or sendfile is None:
+                    raise
+        if offset == 0 and size and sendfile is not None:
+            while offset < size:
+                copied = sendfile(dst.fileno(), src.fileno(), offset, min(size - offset, 1 << 30))
+                if copied == 0:
+                    if offset == 0:
+                        raise _unsupported("sendfile")
+                    break
+                offset += copied
+        if offset < size:
+            raise OSError(errno.EIO, f"复制不完整: {offset}/{size} 字节")
+
+
+def _buffered_copy(source, target):
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+
+
+_METHODS = {
+    METHOD_REFLINK: _reflink,
+    METHOD_HARDLINK: _hardlink,
+    METHOD_KERNEL: _kernel_copy,
+    METHOD_BUFFERED: _buffered_copy,
+}
+
+
+def place_file(source, target, strategy=DEFAULT_PLACEMENT_STRATEGY):
+    """把source放到target（已存在的target被替换），返回实际使用的方式（两者已是同一文件时返回None）
+
+    按策略依次尝试，某种方式失败时删除残留的目标文件再试下一种，最后一种失败时抛出异常。
+    复制得到的文件保留源文件的修改时间和权限（与shutil.copy2一致）；硬链接与源文件共享同一份数据。
+    """
+    if strategy not in PLACEMENT_STRATEGIES:
+        raise ValueError(f"未知的文件放置策略: {strategy}")
+    if os.path.exists(target) and os.path.samefile(source, target):
+        return None
+    # 先删除旧文件：它可能是另一个文件的硬链接，直接覆盖写入会改动那个文件
+    if os.path.lexists(target):
+        os.remove(target)
+
+    methods = PLACEMENT_STRATEGIES[strategy][1]
+    for i, method in enumerate(methods):
+        try:
+            _METHODS[method](source, target)
+        except OSError:
+            if os.path.lexists(target):
+                os.remove(target)
+            if i == len(methods) - 1:
+                raise
+            continue
+        if method != METHOD_HARDLINK:
+            try:
+                shutil.copystat(source, target)
+            except OSError:
+                pass
+        return method
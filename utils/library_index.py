@@ -0,0 +1,256 @@
+"""
+壁纸库索引模块
+将创意工坊目录的扫描结果持久化到SQLite，启动时只重新读取修改过的壁纸目录
+"""
+
+import os
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils.metadata import get_metadata_cache, ProjectMetadata, PROJECT_FILE, SCAN_WORKERS
+
+
+PREVIEW_NAMES = ("preview.jpg", "preview.gif")
+
+# 表结构或记录内容的含义变化时递增，旧索引会被丢弃并重建
+SCHEMA_VERSION = 6
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    workshop_id TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    preview TEXT,
+    title TEXT NOT NULL DEFAULT '',
+    type TEXT NOT NULL DEFAULT '',
+    tags TEXT NOT NULL DEFAULT '[]',
+    description TEXT NOT NULL DEFAULT '',
+    content_rating TEXT NOT NULL DEFAULT '',
+    has_scene_pkg INTEGER NOT NULL DEFAULT 0,
+    has_mp4 INTEGER NOT NULL DEFAULT 0,
+    created_ns INTEGER NOT NULL DEFAULT 0,
+    file_size INTEGER NOT NULL DEFAULT 0,
+    project_file TEXT NOT NULL DEFAULT '',
+    project_preview TEXT NOT NULL DEFAULT '',
+    project_mtime_ns INTEGER NOT NULL DEFAULT 0,
+    project_size INTEGER NOT NULL DEFAULT 0,
+    mtime_ns INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+# mtime_ns必须是最后一列（增量扫描按位置比较）
+COLUMNS = ("workshop_id", "path", "preview", "title", "type", "tags", "description",
+           "content_rating", "has_scene_pkg", "has_mp4", "file_size", "created_ns",
+           "project_file", "project_preview", "project_mtime_ns", "project_size", "mtime_ns")
+
+
+def created_time_ns(stat):
+    """目录的创建时间，近似为订阅时间（不支持创建时间的平台上取ctime）"""
+    return getattr(stat, "st_birthtime_ns", None) or stat.st_ctime_ns
+
+
+def directory_size(path):
+    """目录下所有文件（包括子目录中的）的总字节数，不跟随符号链接"""
+    total = 0
+    pending = [path]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            total += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return total
+
+
+def read_item_directory(item_path, workshop_id=None, mtime_ns=0, created_ns=0):
+    """读取单个壁纸目录，返回索引记录
+
+    目录结构固定为 <创意工坊>/<ID>/preview.*，预览图和project.json只在壁纸目录本身查找；
+    子目录只为统计文件大小而遍历（大小分面和排序需要整个壁纸的大小）。
+    """
+    record = {
+        "workshop_id": workshop_id or os.path.basename(item_path),
+        "path": item_path,
+        "preview": None,
+        "title": "",
+        "type": "",
+        "tags": [],
+        "description": "",
+        "content_rating": "",
+        "has_scene_pkg": False,
+        "has_mp4": False,
+        "file_size": 0,
+        "created_ns": created_ns,
+        "project_file": "",
+        "project_preview": "",
+        "project_mtime_ns": 0,  # 解析时project.json的修改时间和大小（0表示没有或无法解析）
+        "project_size": 0,
+        "mtime_ns": mtime_ns,
+    }
+
+    names = set()
+    project_stat = None
+    with os.scandir(item_path) as it:
+        for entry in it:
+            try:
+                if entry.is_file():
+                    names.add(entry.name)
+                    stat = entry.stat()
+                    record["file_size"] += stat.st_size
+                    if entry.name == PROJECT_FILE:
+                        project_stat = stat
+                elif entry.is_dir(follow_symlinks=False):
+                    record["file_size"] += directory_size(entry.path)
+            except OSError:
+                continue
+
+    record["has_scene_pkg"] = "scene.pkg" in names
+    record["has_mp4"] = any(name.lower().endswith(".mp4") for name in names)
+
+    for name in PREVIEW_NAMES:
+        if name in names:
+            record["preview"] = os.path.join(item_path, name)
+            break
+    else:
+        # 没有预览图的场景壁纸从scene.pkg生成缩略图
+        if "scene.pkg" in names:
+            record["preview"] = os.path.join(item_path, "scene.pkg")
+
+    if PROJECT_FILE in names:
+        # 解析结果同时留在共享缓存中，之后点击或提取时无需再次读取
+        metadata = get_metadata_cache().get(item_path)
+        if metadata is not None:
+            record["title"] = metadata.title
+            record["type"] = metadata.type
+            record["tags"] = list(metadata.tags)
+            record["description"] = metadata.description
+            record["content_rating"] = metadata.content_rating
+            record["project_file"] = metadata.file
+            record["project_preview"] = metadata.preview
+            record["project_mtime_ns"] = project_stat.st_mtime_ns
+            record["project_size"] = project_stat.st_size
+    return record
+
+
+def record_metadata(record):
+    """由索引记录还原project.json的元数据，返回(修改时间, 大小, ProjectMetadata)，记录中没有时返回None"""
+    if not record.get("project_mtime_ns"):
+        return None
+    metadata = ProjectMetadata(record["title"], record["type"], record["tags"], record["description"],
+                               record["content_rating"], record["project_file"], record["project_preview"])
+    return record["project_mtime_ns"], record["project_size"], metadata
+
+
+class LibraryIndex:
+    """壁纸库持久化索引
+
+    以创意工坊ID为键，保存预览图路径、标题、类型、标签、简介、内容分级、包含的文件、文件大小和目录的创建、修改时间。
+    scan()只重新读取修改时间变化的目录，其余记录直接从数据库返回。
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            conn.execute("DROP TABLE IF EXISTS items")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute(SCHEMA)
+        return conn
+
+    @staticmethod
+    def _row_to_record(row):
+        record = dict(zip(COLUMNS, row))
+        record["has_scene_pkg"] = bool(record["has_scene_pkg"])
+        record["has_mp4"] = bool(record["has_mp4"])
+        try:
+            record["tags"] = json.loads(record["tags"])
+        except ValueError:
+            record["tags"] = []
+        return record
+
+    @staticmethod
+    def _record_to_row(record):
+        return tuple(json.dumps(record[c], ensure_ascii=False) if c == "tags" else record[c]
+                     for c in COLUMNS)
+
+    def _scan_item(self, workshop_id, item_path, cached_row):
+        """在线程池中执行：stat目录并与缓存比较，变化时重新读取。返回(记录, 是否变化)"""
+        try:
+            stat = os.stat(item_path)
+        except OSError:
+            return None, False
+        if cached_row is not None and cached_row[1] == item_path and cached_row[-1] == stat.st_mtime_ns:
+            return self._row_to_record(cached_row), False
+        try:
+            return read_item_directory(item_path, workshop_id, stat.st_mtime_ns,
+                                       created_time_ns(stat)), True
+        except OSError as e:
+            print(f"读取壁纸目录失败 ({workshop_id}): {e}")
+            return None, False
+
+    def iter_scan(self, workshop_dir, max_workers=SCAN_WORKERS):
+        """增量扫描创意工坊目录，逐个产出记录（按完成顺序）
+
+        各壁纸目录在线程池中并行stat/读取，结果一经得到立即产出。
+        只有完整遍历后才会写回数据库；中途放弃时索引保持不变。
+        """
+        conn = self._connect()
+        try:
+            cached = {}
+            for row in conn.execute(f"SELECT {', '.join(COLUMNS)} FROM items"):
+                cached[row[0]] = row
+
+            with os.scandir(workshop_dir) as it:
+                item_dirs = []
+                for entry in it:
+                    try:
+                        if entry.is_dir():
+                            item_dirs.append((entry.name, entry.path))
+                    except OSError:
+                        continue
+
+            changed = []
+            pool = ThreadPoolExecutor(max_workers=max_workers)
+            try:
+                futures = [pool.submit(self._scan_item, workshop_id, item_path, cached.get(workshop_id))
+                           for workshop_id, item_path in item_dirs]
+                for future in as_completed(futures):
+                    record, is_changed = future.result()
+                    if record is None:
+                        continue
+                    if is_changed:
+                        changed.append(record)
+                    yield record
+            finally:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+            # 不在当前目录下的缓存记录对应已删除的壁纸
+            removed = set(cached) - {workshop_id for workshop_id, _ in item_dirs}
+            with conn:
+                if changed:
+                    conn.executemany(
+                        f"INSERT OR REPLACE INTO items ({', '.join(COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * len(COLUMNS))})",
+                        [self._record_to_row(record) for record in changed])
+                if removed:
+                    conn.executemany("DELETE FROM items WHERE workshop_id = ?",
+                                     [(workshop_id,) for workshop_id in removed])
+        finally:
+            conn.close()
+
+        if changed or removed:
+            print(f"索引更新: {len(changed)} 个目录重新读取, {len(removed)} 个已移除")
+
+    def scan(self, workshop_dir):
+        """增量扫描创意工坊目录，返回全部记录"""
+        return list(self.iter_scan(workshop_dir))
@@ -0,0 +1,125 @@
+"""
+壁纸元数据模块
+解析project.json并按(修改时间, 文件大小)缓存，所有读取壁纸信息的地方共用同一份缓存
+"""
+
+import os
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+PROJECT_FILE = "project.json"
+
+# 壁纸库扫描和元数据批量加载的线程数：以I/O为主，网络驱动器上每次stat都很慢，线程数可以多于CPU核数
+SCAN_WORKERS = 16
+
+
+class ProjectMetadata:
+    """project.json中的壁纸信息"""
+
+    __slots__ = ("title", "type", "tags", "description", "content_rating", "file", "preview")
+
+    def __init__(self, title="", type="", tags=(), description="", content_rating="",
+                 file="", preview=""):
+        self.title = title
+        self.type = type
+        self.tags = list(tags)
+        self.description = description
+        self.content_rating = content_rating
+        self.file = file
+        self.preview = preview
+
+    @classmethod
+    def from_json(cls, data):
+        """从project.json的内容构造，缺失或类型不对的字段取默认值"""
+        if not isinstance(data, dict):
+            raise ValueError("project.json顶层不是对象")
+        tags = data.get("tags") or []
+        return cls(
+            title=str(data.get("title") or ""),
+            type=str(data.get("type") or "").lower(),
+            tags=[str(tag) for tag in tags] if isinstance(tags, list) else [],
+            description=str(data.get("description") or ""),
+            content_rating=str(data.get("contentrating") or ""),
+            file=str(data.get("file") or ""),
+            preview=str(data.get("preview") or ""),
+        )
+
+    def __repr__(self):
+        return f"ProjectMetadata(title={self.title!r}, type={self.type!r})"
+
+
+class MetadataCache:
+    """project.json解析缓存（线程安全）
+
+    以壁纸目录为键，同时记录project.json的修改时间和大小；
+    每次读取只做一次stat，文件未变化时直接返回缓存的记录，变化后重新解析。
+    """
+
+    def __init__(self):
+        self._items = {}  # 壁纸目录 -> (mtime_ns, size, ProjectMetadata)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, item_path):
+        """返回壁纸目录的元数据，没有或无法解析project.json时返回None"""
+        project_path = os.path.join(item_path, PROJECT_FILE)
+        try:
+            stat = os.stat(project_path)
+        except OSError:
+            with self._lock:
+                self._items.pop(item_path, None)
+            return None
+
+        with self._lock:
+            cached = self._items.get(item_path)
+        if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+
+        try:
+            with open(project_path, "r", encoding="utf-8") as f:
+                metadata = ProjectMetadata.from_json(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"读取project.json失败 ({os.path.basename(item_path)}): {e}")
+            return None
+
+        with self._lock:
+            self._items[item_path] = (stat.st_mtime_ns, stat.st_size, metadata)
+        return metadata
+
+    def seed(self, item_path, mtime_ns, size, metadata):
+        """放入已知的解析结果（例如来自壁纸库索引），之后get()在project.json未变化时直接返回它
+
+        缓存中已有该目录的记录时不覆盖（那是更新的解析结果）。
+        """
+        with self._lock:
+            self._items.setdefault(item_path, (mtime_ns, size, metadata))
+
+    def load_many(self, item_paths, max_workers=SCAN_WORKERS):
+        """在线程池中批量加载，返回 {壁纸目录: 元数据}（没有project.json的目录不包含在内）"""
+        item_paths = list(item_paths)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = pool.map(self.get, item_paths)
+            return {path: metadata for path, metadata in zip(item_paths, results)
+                    if metadata is not None}
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._items.clear()
+
+
+_metadata_cache = None
+_metadata_cache_lock = threading.Lock()
+
+
+def get_metadata_cache():
+    """全局共享的元数据缓存"""
+    global _metadata_cache
+    with _metadata_cache_lock:
+        if _metadata_cache is None:
+            _metadata_cache = MetadataCache()
+        return _metadata_cache
@@ -0,0 +1,202 @@
+"""
+PKG读取模块
+在进程内解析Wallpaper Engine的scene.pkg容器，无需调用RePKG.exe
+"""
+
+import os
+import mmap
+import struct
+from fnmatch import fnmatchcase
+
+
+class PkgEntry:
+    """PKG条目信息"""
+    __slots__ = ("name", "offset", "length")
+
+    def __init__(self, name, offset, length):
+        self.name = name
+        self.offset = offset  # 相对于数据区起点的偏移
+        self.length = length
+
+    def __repr__(self):
+        return f"PkgEntry({self.name!r}, offset={self.offset}, length={self.length})"
+
+
+class EntryFilter:
+    """PKG条目筛选条件，在写出任何文件之前对条目表求值
+
+    include/exclude为glob模式（不区分大小写，'*'可以跨越'/'），include为空时包含所有条目，exclude优先。
+    textures_as_images为True时，选中的.tex纹理只写出转换后的图片，不写出纹理本身；视频纹理（内嵌MP4）跳过。
+    """
+    __slots__ = ("include", "exclude", "textures_as_images")
+
+    def __init__(self, include=(), exclude=(), textures_as_images=False):
+        self.include = tuple(pattern.casefold() for pattern in include)
+        self.exclude = tuple(pattern.casefold() for pattern in exclude)
+        self.textures_as_images = textures_as_images
+
+    def __call__(self, name):
+        name = name.replace("\\", "/").casefold()
+        if any(fnmatchcase(name, pattern) for pattern in self.exclude):
+            return False
+        return not self.include or any(fnmatchcase(name, pattern) for pattern in self.include)
+
+    def __repr__(self):
+        return f"EntryFilter(include={self.include!r}, exclude={self.exclude!r})"
+
+    def extensions(self):
+        """条件只是"*.扩展名"的列表时返回这些扩展名（供RePKG的--onlyexts使用），否则返回None"""
+        if self.exclude or not self.include:
+            return None
+        extensions = []
+        for pattern in self.include:
+            ext = pattern[2:]
+            if not pattern.startswith("*.") or not ext or any(c in ext for c in "*?[/"):
+                return None
+            extensions.append(ext)
+        return extensions
+
+
+IMAGE_PATTERNS = ("*.png", "*.jpg", "*.jpeg")
+TEXTURE_PATTERNS = ("*.tex",)
+
+# 预设的筛选条件
+ENTRY_FILTERS = {
+    "images": EntryFilter(IMAGE_PATTERNS + TEXTURE_PATTERNS, textures_as_images=True),  # 图片（纹理转换为图片）
+    "textures": EntryFilter(TEXTURE_PATTERNS),  # 只要纹理
+}
+
+
+class PkgReader:
+    """PKG容器读取器
+
+    文件结构（小端）：
+        int32 魔数长度 + 魔数（如 "PKGV0019"）
+        int32 条目数
+        条目表：int32 名称长度 + 名称、int32 偏移、int32 长度
+        数据区：条目偏移相对于条目表之后的位置
+
+    文件通过mmap映射，头部和条目表只解析一次，read()返回零拷贝的memoryview。
+    注意：关闭前必须释放所有memoryview，否则mmap无法关闭。
+    """
+
+    MAX_MAGIC_LENGTH = 32
+    MAX_NAME_LENGTH = 255
+
+    def __init__(self, path):
+        self.path = path
+        self.magic = ""
+        self.entries = {}
+        self.data_start = 0
+        self._file = open(path, "rb")
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            if size == 0:
+                raise ValueError(f"PKG文件为空: {path}")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._mmap)
+            self._parse_header()
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __iter__(self):
+        return iter(self.entries.values())
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def _read_int32(self, pos):
+        if pos + 4 > len(self._view):
+            raise ValueError(f"PKG头部被截断: {self.path}")
+        return struct.unpack_from("<i", self._view, pos)[0], pos + 4
+
+    def _read_string(self, pos, max_length):
+        length, pos = self._read_int32(pos)
+        if length < 0 or length > max_length or pos + length > len(self._view):
+            raise ValueError(f"PKG字符串长度无效 ({length}): {self.path}")
+        return bytes(self._view[pos:pos + length]).decode("utf-8", errors="replace"), pos + length
+
+    def _parse_header(self):
+        """解析头部和条目表"""
+        self.magic, pos = self._read_string(0, self.MAX_MAGIC_LENGTH)
+        if not self.magic.startswith("PKGV"):
+            raise ValueError(f"不是有效的PKG文件 (魔数: {self.magic!r}): {self.path}")
+
+        count, pos = self._read_int32(pos)
+        if count < 0:
+            raise ValueError(f"PKG条目数无效 ({count}): {self.path}")
+
+        entries = {}
+        for _ in range(count):
+            name, pos = self._read_string(pos, self.MAX_NAME_LENGTH)
+            offset, pos = self._read_int32(pos)
+            length, pos = self._read_int32(pos)
+            entries[name] = PkgEntry(name, offset, length)
+
+        self.data_start = pos
+        total = len(self._view)
+        for entry in entries.values():
+            end = self.data_start + entry.offset + entry.length
+            if entry.offset < 0 or entry.length < 0 or end > total:
+                raise ValueError(f"PKG条目越界 ({entry.name}): {self.path}")
+        self.entries = entries
+
+    def entry_names(self):
+        """返回所有条目名称"""
+        return list(self.entries)
+
+    def select(self, entry_filter=None):
+        """返回满足筛选条件的条目（entry_filter为None时返回全部）"""
+        if entry_filter is None:
+            return list(self.entries.values())
+        return [entry for entry in self.entries.values() if entry_filter(entry.name)]
+
+    def read(self, name):
+        """以memoryview形式返回条目内容（零拷贝）"""
+        entry = self.entries[name] if isinstance(name, str) else name
+        start = self.data_start + entry.offset
+        return self._view[start:start + entry.length]
+
+    @staticmethod
+    def entry_path(entry, save_dir):
+        """条目在save_dir下的目标路径"""
+        # 条目名使用'/'分隔，去掉开头的分隔符和上级目录引用，防止写出目标目录
+        parts = [p for p in entry.name.replace("\\", "/").split("/") if p not in ("", ".", "..")]
+        return os.path.join(save_dir, *parts)
+
+    def extract_entry(self, name, save_dir):
+        """将单个条目写入save_dir，返回目标路径"""
+        entry = self.entries[name] if isinstance(name, str) else name
+        dst_path = self.entry_path(entry, save_dir)
+        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+        data = self.read(entry)
+        try:
+            with open(dst_path, "wb") as f:
+                f.write(data)
+        finally:
+            data.release()
+        return dst_path
+
+    def close(self):
+        """释放映射和文件句柄"""
+        view = getattr(self, "_view", None)
+        if view is not None:
+            view.release()
+            self._view = None
+        mapped = getattr(self, "_mmap", None)
+        if mapped is not None:
+            mapped.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
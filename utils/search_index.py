@@ -0,0 +1,205 @@
+"""
+搜索索引模块
+对标题、标签、类型、简介和创意工坊ID建立词表倒排索引，支持子串、前缀和容错（拼写错误）查询，
+结果按相关度排序
+"""
+
+import re
+import bisect
+import numpy as np
+
+
+# 各字段的权重：同样的匹配出现在标题里比出现在简介里更相关
+FIELD_WEIGHTS = {
+    "workshop_id": 3.0,
+    "title": 3.0,
+    "tags": 2.0,
+    "type": 1.5,
+    "description": 1.0,
+}
+
+# 各种匹配方式的得分系数
+MATCH_EXACT = 1.0
+MATCH_PREFIX = 0.8
+MATCH_SUBSTRING = 0.6
+MATCH_FUZZY = (0.5, 0.35)  # 编辑距离为1、2时
+
+# 词表n-gram的最大长度
+MAX_GRAM = 3
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """把文本拆分为小写的词（中文等连续文字整体作为一个词，子串查询仍可命中）"""
+    return _TOKEN_RE.findall(str(text).casefold())
+
+
+def iter_grams(text, max_gram=MAX_GRAM):
+    """返回文本中所有长度为1~max_gram的子串（去重）"""
+    grams = set()
+    for n in range(1, max_gram + 1):
+        for i in range(len(text) - n + 1):
+            grams.add(text[i:i + n])
+    return grams
+
+
+def max_typos(term):
+    """查询词允许的拼写错误数：短词和纯数字（创意工坊ID）不容错，4~7个字符1处，更长2处"""
+    if len(term) < 4 or term.isdigit():
+        return 0
+    return 1 if len(term) < 8 else 2
+
+
+def edit_distance(a, b, limit):
+    """计算编辑距离（相邻字符交换算一次），超过limit时提前返回limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before = None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+class SearchIndex:
+    """多字段相关度搜索索引（构建后只读，可在多个线程中同时查询）
+
+    构建时把每个条目的各字段拆分为词，得到全局词表；每个词对应一组(条目编号, 字段权重)数组。
+    查询时每个查询词先在词表中找到匹配的词（精确、前缀、子串、容错），
+    再把这些词的倒排数组合并为每个条目的得分，多个查询词的得分相加且必须全部命中。
+    词表按字母序排列，前缀匹配用二分查找；子串和容错候选来自词表的n-gram倒排表。
+    """
+
+    def __init__(self, entries=()):
+        self.keys = []
+        postings = {}  # 词 -> {条目编号: 最高字段权重}
+        for key, fields in entries:
+            doc_id = len(self.keys)
+            self.keys.append(key)
+            for field, weight in FIELD_WEIGHTS.items():
+                value = fields.get(field)
+                if not value:
+                    continue
+                if isinstance(value, (list, tuple)):
+                    value = " ".join(str(v) for v in value)
+                for token in tokenize(value):
+                    docs = postings.setdefault(token, {})
+                    if docs.get(doc_id, 0) < weight:
+                        docs[doc_id] = weight
+
+        self.vocabulary = sorted(postings)
+        self.token_docs = []
+        self.token_weights = []
+        grams = {}
+        for token_id, token in enumerate(self.vocabulary):
+            docs = postings[token]
+            self.token_docs.append(np.fromiter(docs.keys(), dtype=np.int32, count=len(docs)))
+            self.token_weights.append(np.fromiter(docs.values(), dtype=np.float32, count=len(docs)))
+            for gram in iter_grams(token):
+                grams.setdefault(gram, []).append(token_id)
+        # 词编号按字母序递增，数组天然有序
+        self.gram_tokens = {gram: np.array(ids, dtype=np.int32) for gram, ids in grams.items()}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _substring_tokens(self, term):
+        """返回包含term的词编号数组"""
+        if len(term) <= MAX_GRAM:
+            return self.gram_tokens.get(term, np.empty(0, dtype=np.int32))
+        arrays = []
+        for i in range(len(term) - MAX_GRAM + 1):
+            ids = self.gram_tokens.get(term[i:i + MAX_GRAM])
+            if ids is None:
+                return np.empty(0, dtype=np.int32)
+            arrays.append(ids)
+        arrays.sort(key=len)
+        result = arrays[0]
+        for ids in arrays[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, ids, assume_unique=True)
+        return np.array([i for i in result.tolist() if term in self.vocabulary[i]], dtype=np.int32)
+
+    def _fuzzy_tokens(self, term, typos, exclude):
+        """返回与term编辑距离不超过typos的词 [(词编号, 距离)]
+
+        每处插入、删除、替换最多破坏2个二元组，相邻交换最多3个，
+        因此距离不超过k的两个词至少共享 (len-1) - 3k 个二元组，
+        先用二元组计数筛出候选，再逐个计算编辑距离。
+        """
+        bigrams = {term[i:i + 2] for i in range(len(term) - 1)}
+        arrays = [self.gram_tokens[g] for g in bigrams if g in self.gram_tokens]
+        if not arrays:
+            return []
+        candidates, counts = np.unique(np.concatenate(arrays), return_counts=True)
+        threshold = max(1, len(term) - 1 - 3 * typos)
+        matches = []
+        for token_id in candidates[counts >= threshold].tolist():
+            if token_id in exclude:
+                continue
+            token = self.vocabulary[token_id]
+            distance = edit_distance(term, token, typos)
+            if distance <= typos:
+                matches.append((token_id, distance))
+        return matches
+
+    def match_tokens(self, term):
+        """返回词表中与查询词匹配的 {词编号: 匹配得分系数}"""
+        matched = {}
+        # 前缀（含精确匹配）：词表有序，前缀相同的词是连续的一段
+        start = bisect.bisect_left(self.vocabulary, term)
+        end = bisect.bisect_left(self.vocabulary, term + "\U0010ffff", start)
+        for token_id in range(start, end):
+            matched[token_id] = MATCH_EXACT if self.vocabulary[token_id] == term else MATCH_PREFIX
+        # 子串：单个字符的子串太泛，不参与
+        if len(term) >= 2:
+            for token_id in self._substring_tokens(term).tolist():
+                matched.setdefault(token_id, MATCH_SUBSTRING)
+        # 容错
+        typos = max_typos(term)
+        if typos:
+            for token_id, distance in self._fuzzy_tokens(term, typos, matched):
+                matched[token_id] = MATCH_FUZZY[distance - 1]
+        return matched
+
+    def _term_scores(self, term):
+        """返回每个条目对该查询词的得分（未命中为0）"""
+        scores = np.zeros(len(self.keys), dtype=np.float32)
+        matched = self.match_tokens(term)
+        if not matched:
+            return scores
+        docs = np.concatenate([self.token_docs[i] for i in matched])
+        values = np.concatenate([self.token_weights[i] * factor for i, factor in matched.items()])
+        np.maximum.at(scores, docs, values)
+        return scores
+
+    def search(self, query):
+        """查询，返回按相关度从高到低排列的条目键列表（同分时保持加入顺序）"""
+        terms = tokenize(query)
+        if not terms:
+            return list(self.keys)
+
+        total = None
+        for term in dict.fromkeys(terms):
+            scores = self._term_scores(term)
+            if total is None:
+                total = scores
+            else:
+                # 所有查询词都必须命中
+                total = np.where((total > 0) & (scores > 0), total + scores, 0)
+            if not total.any():
+                return []
+
+        ids = np.flatnonzero(total)
+        order = ids[np.argsort(-total[ids], kind="stable")]
+        return [self.keys[i] for i in order.tolist()]
@@ -0,0 +1,73 @@
+"""
+排序模块
+为标题、创意工坊ID、订阅日期、修改日期和文件大小预先计算排序排列（NumPy数组），切换排序时无需重新排序
+"""
+
+import numpy as np
+
+
+# 排序键 -> 显示名称
+SORT_KEYS = {
+    "title": "标题",
+    "workshop_id": "创意工坊ID",
+    "created": "订阅日期",
+    "modified": "修改日期",
+    "size": "大小",
+}
+
+
+class SortIndex:
+    """预排序索引（构建后只读）
+
+    每个排序键保存一个排列数组 order（按该键升序排列的条目编号）和它的逆 rank（条目编号 -> 名次）。
+    整个列表排序就是按 order 取值；对搜索、筛选得到的子集排序只需比较各条目的名次。
+    """
+
+    def __init__(self, records):
+        self.keys = [record["preview"] for record in records]
+        self.positions = {key: i for i, key in enumerate(self.keys)}
+        count = len(self.keys)
+
+        # 同值时以创意工坊ID为次序，结果稳定
+        ids = [record.get("workshop_id") or "" for record in records]
+        id_numbers = np.array([int(i) if i.isdigit() else -1 for i in ids], dtype=np.int64)
+        id_order = np.lexsort((np.array(ids, dtype=str), id_numbers))
+
+        def order_by(values):
+            values = np.asarray(values)
+            return id_order[np.argsort(values[id_order], kind="stable")]
+
+        self.orders = {
+            "title": order_by([(record.get("title") or "").casefold() for record in records]),
+            "workshop_id": id_order,
+            "created": order_by([record.get("created_ns") or 0 for record in records]),
+            "modified": order_by([record.get("mtime_ns") or 0 for record in records]),
+            "size": order_by([record.get("file_size") or 0 for record in records]),
+        }
+        self.ranks = {}
+        for name, order in self.orders.items():
+            rank = np.empty(count, dtype=np.int64)
+            rank[order] = np.arange(count)
+            self.ranks[name] = rank
+
+    def __len__(self):
+        return len(self.keys)
+
+    def sorted_keys(self, sort_key, descending=False, mask=None):
+        """返回按sort_key排序的全部条目键；mask为布尔数组时只保留为True的条目"""
+        order = self.orders[sort_key]
+        if descending:
+            order = order[::-1]
+        if mask is not None:
+            order = order[mask[order]]
+        return [self.keys[i] for i in order.tolist()]
+
+    def sort(self, keys, sort_key, descending=False):
+        """按sort_key对条目键的子集排序（不在索引中的键排在最后）"""
+        rank = self.ranks[sort_key]
+        missing = len(self.keys)
+        ranks = np.fromiter((rank[self.positions[key]] if key in self.positions else missing
+                             for key in keys), dtype=np.int64, count=len(keys))
+        if descending:
+            ranks = np.where(ranks == missing, 1, -ranks)
+        return [keys[i] for i in np.argsort(ranks, kind="stable").tolist()]
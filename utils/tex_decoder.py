@@ -0,0 +1,382 @@
+"""
+TEX纹理解码模块
+在进程内解析Wallpaper Engine的.tex纹理（TEXV/TEXI/TEXB），支持LZ4压缩的mipmap
+"""
+
+import struct
+import zlib
+
+try:
+    import lz4.block as lz4_block
+except ImportError:
+    lz4_block = None
+
+
+# 纹理像素格式
+TEX_FORMAT_RGBA8888 = 0
+TEX_FORMAT_DXT5 = 4
+TEX_FORMAT_DXT3 = 6
+TEX_FORMAT_DXT1 = 7
+TEX_FORMAT_RG88 = 8
+TEX_FORMAT_R8 = 9
+
+# DXT格式对应的解码函数（utils.dxt_decoder，依赖NumPy）
+DXT_DECODERS = {
+    TEX_FORMAT_DXT1: "decode_dxt1",
+    TEX_FORMAT_DXT3: "decode_dxt3",
+    TEX_FORMAT_DXT5: "decode_dxt5",
+}
+
+# FreeImage格式（mipmap内嵌完整图片文件时使用）
+FIF_UNKNOWN = -1
+FIF_MP4 = -2
+FREE_IMAGE_EXTENSIONS = {
+    0: ".bmp",
+    2: ".jpg",
+    13: ".png",
+    17: ".tga",
+    18: ".tif",
+    25: ".gif",
+    35: ".webp",
+    FIF_MP4: ".mp4",
+}
+
+
+def lz4_decompress(data, uncompressed_size):
+    """解压LZ4块（非帧格式）数据，优先使用lz4库"""
+    if lz4_block is not None:
+        return lz4_block.decompress(bytes(data), uncompressed_size=uncompressed_size)
+
+    src = bytes(data)
+    dst = bytearray()
+    pos = 0
+    end = len(src)
+    while pos < end:
+        token = src[pos]
+        pos += 1
+
+        # 字面量
+        literal_length = token >> 4
+        if literal_length == 15:
+            while True:
+                extra = src[pos]
+                pos += 1
+                literal_length += extra
+                if extra != 255:
+                    break
+        dst += src[pos:pos + literal_length]
+        pos += literal_length
+        if pos >= end:
+            break
+
+        # 匹配
+        offset = src[pos] | (src[pos + 1] << 8)
+        pos += 2
+        if offset == 0 or offset > len(dst):
+            raise ValueError("LZ4数据损坏：匹配偏移无效")
+        match_length = token & 0x0F
+        if match_length == 15:
+            while True:
+                extra = src[pos]
+                pos += 1
+                match_length += extra
+                if extra != 255:
+                    break
+        match_length += 4
+
+        start = len(dst) - offset
+        if match_length <= offset:
+            dst += dst[start:start + match_length]
+        else:
+            # 重叠拷贝：匹配内容是最近offset字节的重复
+            pattern = dst[start:]
+            dst += (pattern * (match_length // offset + 1))[:match_length]
+
+    if len(dst) != uncompressed_size:
+        raise ValueError(f"LZ4解压长度不符: {len(dst)} != {uncompressed_size}")
+    return bytes(dst)
+
+
+class TexMipmap:
+    """单个mipmap层级"""
+    __slots__ = ("width", "height", "data", "is_lz4", "decompressed_size")
+
+    def __init__(self, width, height, data, is_lz4=False, decompressed_size=0):
+        self.width = width
+        self.height = height
+        self.data = data  # memoryview或bytes，可能为LZ4压缩数据
+        self.is_lz4 = is_lz4
+        self.decompressed_size = decompressed_size
+
+    def get_bytes(self):
+        """返回解压后的原始数据"""
+        if self.is_lz4:
+            return lz4_decompress(self.data, self.decompressed_size)
+        return bytes(self.data)
+
+
+class TexFile:
+    """TEX纹理文件
+
+    只解析头部和mipmap表，mipmap数据保持为对原始缓冲区的切片，
+    解压和解码在调用decode_rgba()时按需进行。
+    """
+
+    def __init__(self, data):
+        self._view = memoryview(data)
+        self._pos = 0
+        self.magic = ""
+        self.format = TEX_FORMAT_RGBA8888
+        self.flags = 0
+        self.texture_width = 0
+        self.texture_height = 0
+        self.image_width = 0
+        self.image_height = 0
+        self.container_magic = ""
+        self.image_format = FIF_UNKNOWN
+        self.images = []  # 每个元素为一帧的mipmap列表，mipmap按尺寸从大到小排列
+        try:
+            self._parse()
+        except Exception:
+            self.release()
+            raise
+
+    @classmethod
+    def from_file(cls, path):
+        """从文件读取纹理"""
+        with open(path, "rb") as f:
+            return cls(f.read())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+    def release(self):
+        """释放对原始缓冲区的引用（数据来自PkgReader.read()时，关闭PKG前必须调用）"""
+        for mipmaps in self.images:
+            for mipmap in mipmaps:
+                if isinstance(mipmap.data, memoryview):
+                    mipmap.data.release()
+        self.images = []
+        self._view.release()
+
+    # ------------------------- 读取辅助 -------------------------
+
+    def _read_int32(self):
+        if self._pos + 4 > len(self._view):
+            raise ValueError("TEX数据被截断")
+        value = struct.unpack_from("<i", self._view, self._pos)[0]
+        self._pos += 4
+        return value
+
+    def _read_nstring(self, max_length=16):
+        """读取以\\0结尾的字符串"""
+        start = self._pos
+        limit = min(len(self._view), start + max_length + 1)
+        raw = bytes(self._view[start:limit])
+        end = raw.find(b"\0")
+        if end < 0:
+            raise ValueError("TEX字符串未结束")
+        self._pos = start + end + 1
+        return raw[:end].decode("ascii", errors="replace")
+
+    def _read_bytes(self, length):
+        if length < 0 or self._pos + length > len(self._view):
+            raise ValueError("TEX数据被截断")
+        data = self._view[self._pos:self._pos + length]
+        self._pos += length
+        return data
+
+    # ------------------------- 解析 -------------------------
+
+    def _parse(self):
+        self.magic = self._read_nstring()
+        if not self.magic.startswith("TEXV"):
+            raise ValueError(f"不是有效的TEX文件 (魔数: {self.magic!r})")
+        magic2 = self._read_nstring()
+        if not magic2.startswith("TEXI"):
+            raise ValueError(f"TEX头部无效 (魔数: {magic2!r})")
+
+        self.format = self._read_int32()
+        self.flags = self._read_int32()
+        self.texture_width = self._read_int32()
+        self.texture_height = self._read_int32()
+        self.image_width = self._read_int32()
+        self.image_height = self._read_int32()
+        self._read_int32()  # 未知字段
+
+        self.container_magic = self._read_nstring()
+        if not self.container_magic.startswith("TEXB"):
+            raise ValueError(f"TEX图像容器无效 (魔数: {self.container_magic!r})")
+        version = int(self.container_magic[4:] or 0)
+        image_count = self._read_int32()
+
+        is_video = False
+        if version == 3:
+            self.image_format = self._read_int32()
+        elif version >= 4:
+            self.image_format = self._read_int32()
+            is_video = self._read_int32() == 1
+            if self.image_format == FIF_UNKNOWN and is_video:
+                self.image_format = FIF_MP4
+
+        for _ in range(image_count):
+            mipmap_count = self._read_int32()
+            mipmaps = []
+            for _ in range(mipmap_count):
+                mipmaps.append(self._read_mipmap(version, is_video))
+            self.images.append(mipmaps)
+
+    def _read_mipmap(self, version, is_video):
+        if version >= 4 and is_video:
+            # 视频纹理的mipmap带有额外参数和条件JSON
+            self._read_int32()
+            self._read_int32()
+            self._read_nstring(max_length=1 << 20)
+            self._read_int32()
+
+        width = self._read_int32()
+        height = self._read_int32()
+        if version == 1:
+            length = self._read_int32()
+            return TexMipmap(width, height, self._read_bytes(length))
+
+        is_lz4 = self._read_int32() == 1
+        decompressed_size = self._read_int32()
+        length = self._read_int32()
+        return TexMipmap(width, height, self._read_bytes(length), is_lz4, decompressed_size)
+
+    # ------------------------- 解码 -------------------------
+
+    @property
+    def is_encoded_image(self):
+        """mipmap是否为内嵌的完整图片/视频文件（PNG、JPG、MP4等）"""
+        return self.image_format != FIF_UNKNOWN
+
+    @property
+    def is_video(self):
+        """mipmap是否为内嵌的视频文件（MP4）"""
+        return self.image_format == FIF_MP4
+
+    @property
+    def encoded_extension(self):
+        """内嵌图片文件对应的扩展名"""
+        return FREE_IMAGE_EXTENSIONS.get(self.image_format, ".bin")
+
+    def get_mipmaps(self, image_index=0):
+        """返回指定帧的mipmap列表"""
+        if image_index >= len(self.images) or not self.images[image_index]:
+            raise ValueError("TEX中没有图像数据")
+        return self.images[image_index]
+
+    def decode_rgba(self, mipmap=None):
+        """将mipmap解码为RGBA8888，返回(宽, 高, bytes)
+
+        mipmap为None时解码第一帧的最大层级。结果按比例裁剪到实际图像尺寸。
+        """
+        if self.is_encoded_image:
+            raise ValueError("该纹理为内嵌图片文件，请使用get_bytes()获取原始数据")
+
+        if mipmap is None:
+            mipmap = self.get_mipmaps()[0]
+        raw = mipmap.get_bytes()
+        width, height = mipmap.width, mipmap.height
+
+        if self.format == TEX_FORMAT_RGBA8888:
+            rgba = raw[:width * height * 4]
+        elif self.format == TEX_FORMAT_RG88:
+            rgba = _expand_rg88(raw, width * height)
+        elif self.format == TEX_FORMAT_R8:
+            rgba = _expand_r8(raw, width * height)
+        elif self.format in DXT_DECODERS:
+            from utils import dxt_decoder
+            decode = getattr(dxt_decoder, DXT_DECODERS[self.format])
+            rgba = decode(raw, width, height).tobytes()
+        else:
+            raise ValueError(f"未知的纹理格式: {self.format}")
+
+        if len(rgba) < width * height * 4:
+            raise ValueError("纹理数据长度不足")
+
+        image_width, image_height = self.get_image_size(mipmap)
+        return _crop_rgba(rgba, width, height, image_width, image_height)
+
+    def get_image_size(self, mipmap):
+        """返回mipmap中实际图像（不含2的幂对齐填充）的尺寸"""
+        width, height = mipmap.width, mipmap.height
+        if self.texture_width > 0 and 0 < self.image_width < self.texture_width:
+            width = max(1, self.image_width * mipmap.width // self.texture_width)
+        if self.texture_height > 0 and 0 < self.image_height < self.texture_height:
+            height = max(1, self.image_height * mipmap.height // self.texture_height)
+        return width, height
+
+
+def _expand_r8(raw, pixel_count):
+    """灰度 -> RGBA"""
+    gray = raw[:pixel_count]
+    rgba = bytearray(pixel_count * 4)
+    rgba[0::4] = gray
+    rgba[1::4] = gray
+    rgba[2::4] = gray
+    rgba[3::4] = b"\xff" * pixel_count
+    return bytes(rgba)
+
+
+def _expand_rg88(raw, pixel_count):
+    """灰度+透明度 -> RGBA"""
+    gray = raw[0:pixel_count * 2:2]
+    alpha = raw[1:pixel_count * 2:2]
+    rgba = bytearray(pixel_count * 4)
+    rgba[0::4] = gray
+    rgba[1::4] = gray
+    rgba[2::4] = gray
+    rgba[3::4] = alpha
+    return bytes(rgba)
+
+
+def _crop_rgba(rgba, width, height, image_width, image_height):
+    """纹理尺寸按2的幂对齐，裁剪回实际图像尺寸"""
+    if image_width >= width and image_height >= height:
+        return width, height, rgba
+    crop_width = min(image_width, width)
+    crop_height = min(image_height, height)
+    stride = width * 4
+    row_bytes = crop_width * 4
+    rows = [rgba[y * stride:y * stride + row_bytes] for y in range(crop_height)]
+    return crop_width, crop_height, b"".join(rows)
+
+
+def encode_png(width, height, rgba):
+    """将RGBA8888数据编码为PNG（无需Qt）"""
+    def chunk(tag, payload):
+        body = tag + payload
+        return struct.pack(">I", len(payload)) + body + struct.pack(">I", zlib.crc32(body) & 0xFFFFFFFF)
+
+    stride = width * 4
+    scanlines = b"".join(b"\x00" + rgba[y * stride:(y + 1) * stride] for y in range(height))
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", ihdr) +
+            chunk(b"IDAT", zlib.compress(scanlines, 6)) + chunk(b"IEND", b""))
+
+
+def to_qimage(width, height, rgba):
+    """将RGBA8888数据转换为QImage（深拷贝，不依赖原缓冲区）"""
+    from PyQt6.QtGui import QImage
+    image = QImage(rgba, width, height, width * 4, QImage.Format.Format_RGBA8888)
+    return image.copy()
+
+
+def convert_tex(data, images_only=False):
+    """将TEX数据转换为可直接保存的图片，返回(扩展名, bytes)
+
+    视频纹理原样返回内嵌的MP4；images_only为True时视频纹理返回None。
+    """
+    with TexFile(data) as tex:
+        if images_only and tex.is_video:
+            return None
+        if tex.is_encoded_image:
+            return tex.encoded_extension, tex.get_mipmaps()[0].get_bytes()
+        width, height, rgba = tex.decode_rgba()
+    return ".png", encode_png(width, height, rgba)
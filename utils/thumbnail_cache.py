@@ -0,0 +1,197 @@
+"""
+缩略图缓存模块
+- 磁盘缓存：将缩放后的缩略图保存在磁盘上，按(路径, 文件大小, 修改时间, 缩略图尺寸)定位
+- 内存缓存：保存已解码的缩略图，翻页时无需重新解码
+两者超出容量时都按LRU淘汰
+"""
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+DEFAULT_CACHE_MB = 256
+DEFAULT_MEMORY_CACHE_MB = 64
+DEFAULT_PREVIEW_CACHE_MB = 16  # 预览面板最近显示的图片，280x280约300KB一张
+
+
+class ThumbnailDiskCache:
+    """磁盘缩略图缓存
+
+    缓存文件的修改时间作为最近访问时间（命中时刷新），淘汰时删除最久未使用的文件，
+    直到总大小降到容量的90%以下。源文件变化后键随之改变，旧条目自然被淘汰。
+    """
+
+    SUFFIX = ".thumb"
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_CACHE_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._total_bytes = None  # 首次写入时统计
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(path, size):
+        """根据源文件的路径、大小、修改时间和缩略图尺寸生成键，源文件不存在时返回None"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        raw = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}|{size}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + self.SUFFIX)
+
+    def get(self, path, size):
+        """返回缓存的缩略图数据（bytes），未命中返回None"""
+        key = self.make_key(path, size)
+        if key is None:
+            return None
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, "rb") as f:
+                data = f.read()
+            os.utime(entry_path)  # 刷新最近使用时间
+            return data
+        except OSError:
+            return None
+
+    def put(self, path, size, data):
+        """写入缩略图数据，必要时淘汰旧条目"""
+        key = self.make_key(path, size)
+        if key is None or not data or self.max_bytes <= 0:
+            return
+        entry_path = self._entry_path(key)
+        tmp_path = f"{entry_path}.{threading.get_ident()}.tmp"
+        try:
+            replaced = os.path.getsize(entry_path)  # 覆盖已有条目时从总大小中减去
+        except OSError:
+            replaced = 0
+        try:
+            os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, entry_path)
+        except OSError as e:
+            print(f"写入缩略图缓存失败: {e}")
+            return
+        finally:
+            if os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._list_entries())
+            else:
+                self._total_bytes += len(data) - replaced
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _list_entries(self):
+        """返回所有缓存文件的(路径, 大小, 修改时间)"""
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for sub in os.scandir(self.cache_dir):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith(self.SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((entry.path, stat.st_size, stat.st_mtime_ns))
+        return entries
+
+    def _evict(self):
+        """按最近使用时间淘汰，直到低于容量的90%（调用方持有锁）"""
+        entries = sorted(self._list_entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 9 // 10
+        for entry_path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(entry_path)
+                total -= size
+            except OSError:
+                continue
+        self._total_bytes = total
+
+    def set_max_bytes(self, max_bytes):
+        """修改容量上限，超出部分在下次写入或调用trim()时淘汰"""
+        self.max_bytes = max_bytes
+
+    def trim(self):
+        """淘汰超出容量上限的部分（需要遍历缓存目录，界面中在后台线程调用）"""
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._list_entries())
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            for entry_path, _, _ in self._list_entries():
+                try:
+                    os.remove(entry_path)
+                except OSError:
+                    pass
+            self._total_bytes = 0
+
+
+class ThumbnailMemoryCache:
+    """内存缩略图缓存（线程安全）
+
+    保存已解码的QImage，按(路径, 尺寸)定位，总字节数超过上限时淘汰最久未使用的条目。
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MEMORY_CACHE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, path, size):
+        """返回缓存的QImage并标记为最近使用，未命中返回None"""
+        key = (path, size)
+        with self._lock:
+            image = self._items.get(key)
+            if image is not None:
+                self._items.move_to_end(key)
+            return image
+
+    def put(self, path, size, image):
+        """加入缓存，超出上限时淘汰最久未使用的条目"""
+        if image is None or image.isNull():
+            return
+        key = (path, size)
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old.sizeInBytes()
+            self._items[key] = image
+            self._total_bytes += image.sizeInBytes()
+            while self._total_bytes > self.max_bytes and len(self._items) > 1:
+                _, evicted = self._items.popitem(last=False)
+                self._total_bytes -= evicted.sizeInBytes()
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._items.clear()
+            self._total_bytes = 0
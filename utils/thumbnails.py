@@ -0,0 +1,143 @@
+"""
+缩略图模块
+解码预览图（JPG/GIF）和scene.pkg纹理为缩略图，并对接磁盘缩略图缓存
+"""
+
+import os
+from PyQt6.QtCore import Qt, QBuffer, QIODevice
+from PyQt6.QtGui import QImage, QImageReader
+
+from utils.pkg_reader import PkgReader
+from utils.tex_decoder import TexFile, FIF_MP4, to_qimage
+
+
+THUMBNAIL_SIZE = 180
+PREVIEW_SIZE = 280  # 右侧预览面板
+
+
+def find_largest_texture(reader):
+    """返回PKG中面积最大的纹理条目，没有纹理时返回None
+
+    只解析各纹理的头部和mipmap表，不解压任何像素数据。
+    """
+    best_entry = None
+    best_area = 0
+    for entry in reader:
+        if not entry.name.lower().endswith(".tex"):
+            continue
+        data = reader.read(entry)
+        try:
+            with TexFile(data) as tex:
+                if tex.image_format == FIF_MP4:
+                    continue
+                area = tex.texture_width * tex.texture_height
+        except ValueError:
+            continue
+        finally:
+            data.release()
+        if area > best_area:
+            best_entry = entry
+            best_area = area
+    return best_entry
+
+
+def select_mipmap(mipmaps, size):
+    """选择能填满size×size（保持比例）的最小mipmap，都不够大时返回最大的一级"""
+    suitable = [m for m in mipmaps if max(m.width, m.height) >= size]
+    if not suitable:
+        return max(mipmaps, key=lambda m: m.width * m.height)
+    return min(suitable, key=lambda m: m.width * m.height)
+
+
+def decode_tex_thumbnail(data, size):
+    """从TEX数据解码出缩略图QImage，只解压选中的mipmap"""
+    with TexFile(data) as tex:
+        mipmap = select_mipmap(tex.get_mipmaps(), size)
+        if tex.is_encoded_image:
+            image = QImage.fromData(mipmap.get_bytes())
+        else:
+            width, height, rgba = tex.decode_rgba(mipmap)
+            image = to_qimage(width, height, rgba)
+
+    if image.isNull():
+        return None
+    if image.width() > size or image.height() > size:
+        image = image.scaled(size, size, Qt.AspectRatioMode.KeepAspectRatio,
+                             Qt.TransformationMode.SmoothTransformation)
+    return image
+
+
+def load_pkg_thumbnail(pkg_path, size=THUMBNAIL_SIZE):
+    """从scene.pkg中最大的纹理生成缩略图，失败返回None"""
+    try:
+        with PkgReader(pkg_path) as reader:
+            entry = find_largest_texture(reader)
+            if entry is None:
+                return None
+            data = reader.read(entry)
+            try:
+                return decode_tex_thumbnail(data, size)
+            finally:
+                data.release()
+    except Exception as e:
+        print(f"生成PKG缩略图失败 ({os.path.basename(os.path.dirname(pkg_path))}): {e}")
+        return None
+
+
+def load_thumbnail_image(path, size=THUMBNAIL_SIZE):
+    """将预览图（JPG/GIF首帧）或scene.pkg解码为不超过size×size的QImage，失败返回None"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".pkg":
+        return load_pkg_thumbnail(path, size)
+    if ext not in (".jpg", ".jpeg", ".png", ".gif"):
+        return None
+
+    reader = QImageReader(path)
+    original = reader.size()  # 只读取文件头
+    if original.isValid() and (original.width() > size * 2 or original.height() > size * 2):
+        # 请求缩小解码：JPEG在DCT域按1/2~1/8缩小，不会分配全分辨率缓冲区。
+        # 先解码到目标的2倍，再平滑缩放到目标尺寸，避免快速缩放带来的锯齿
+        target = original.scaled(size * 2, size * 2, Qt.AspectRatioMode.KeepAspectRatio)
+        reader.setScaledSize(target)
+
+    image = reader.read()
+    if image.isNull():
+        return None
+    return image.scaled(size, size, Qt.AspectRatioMode.KeepAspectRatio,
+                        Qt.TransformationMode.SmoothTransformation)
+
+
+def encode_thumbnail(image):
+    """将缩略图编码为bytes：不透明图片用JPG，带透明通道的用PNG"""
+    buffer = QBuffer()
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    if image.hasAlphaChannel():
+        image.save(buffer, "PNG")
+    else:
+        image.save(buffer, "JPG", 90)
+    return bytes(buffer.data())
+
+
+def load_cached_thumbnail(path, size=THUMBNAIL_SIZE, cache=None, memory_cache=None):
+    """依次查找内存缓存、磁盘缓存，都未命中时解码并写入两级缓存"""
+    if memory_cache is not None:
+        image = memory_cache.get(path, size)
+        if image is not None:
+            return image
+
+    image = None
+    if cache is not None:
+        data = cache.get(path, size)
+        if data:
+            image = QImage.fromData(data)
+            if image.isNull():
+                image = None
+
+    if image is None:
+        image = load_thumbnail_image(path, size)
+        if image is not None and cache is not None:
+            cache.put(path, size, encode_thumbnail(image))
+
+    if image is not None and memory_cache is not None:
+        memory_cache.put(path, size, image)
+    return image
@@ -4,10 +4,23 @@
 """
 
 import os
+import time
+import heapq
+import itertools
+import threading
 import subprocess
-import json
-from PyQt6.QtCore import QThread, pyqtSignal, Qt
-from PyQt6.QtGui import QPixmap, QMovie
+from functools import partial
+from PyQt6.QtCore import QObject, QThread, QThreadPool, pyqtSignal
+
+from utils.file_operations import FileOperations
+from utils.batch_extract import BatchExtractor, find_batch_items, REPKG_GROUP_SIZE
+from utils.file_placement import DEFAULT_PLACEMENT_STRATEGY
+from utils.search_index import SearchIndex
+from utils.facets import FacetIndex
+from utils.sort_index import SortIndex
+from utils.metadata import get_metadata_cache
+from utils.library_index import record_metadata
+from utils.thumbnails import load_cached_thumbnail, THUMBNAIL_SIZE
 
 
 class ExtractWorker(QThread):
@@ -27,59 +40,344 @@ class ExtractWorker(QThread):
             self.error.emit(str(e))
 
 
-class ImageLoadWorker(QThread):
-    """图片异步加载工作线程"""
-    imageLoaded = pyqtSignal(int, str, object)  # 索引、路径、QPixmap或QMovie
-    progressChanged = pyqtSignal(int, int)  # 当前进度、总数
+class PkgExtractWorker(QThread):
+    """进程内PKG提取工作线程（不依赖RePKG.exe）"""
     finished = pyqtSignal()
+    error = pyqtSignal(str)
 
-    def __init__(self, image_paths, start_idx):
+    def __init__(self, pkg_path, save_dir, entry_filter=None):
         super().__init__()
-        self.image_paths = image_paths
-        self.start_idx = start_idx
+        self.pkg_path = pkg_path
+        self.save_dir = save_dir
+        self.entry_filter = entry_filter
 
     def run(self):
-        for i, imagePath in enumerate(self.image_paths):
-            fileExt = os.path.splitext(imagePath)[1].lower()
-            display_object = None
-
-            if fileExt in ['.jpg', '.jpeg']:
-                pixmap = QPixmap(imagePath)
-                display_object = pixmap.scaled(180, 180, Qt.AspectRatioMode.KeepAspectRatio,
-                                             Qt.TransformationMode.SmoothTransformation)
-            elif fileExt == '.gif':
-                movie = QMovie(imagePath)
-                if movie.isValid():
-                    movie.jumpToFrame(0)
-                    display_object = movie.currentPixmap().scaled(
-                        180, 180, Qt.AspectRatioMode.KeepAspectRatio,
-                        Qt.TransformationMode.SmoothTransformation)
-
-            self.imageLoaded.emit(i, imagePath, display_object)
-            self.progressChanged.emit(i + 1, len(self.image_paths))
+        try:
+            FileOperations.extract_pkg(self.pkg_path, self.save_dir, entry_filter=self.entry_filter)
+            self.finished.emit()
+        except Exception as e:
+            self.error.emit(str(e))
+
+
+class BatchExtractWorker(QThread):
+    """批量提取工作线程：在线程中查找壁纸并驱动进程池，把进度推送到界面
+
+    查找壁纸需要遍历整个文件夹（网络驱动器上很慢），也在线程中进行，找到后通过itemsFound报告数量。
+    """
+    itemsFound = pyqtSignal(int)   # 找到的壁纸数
+    progress = pyqtSignal(object)  # BatchProgress
+    finished = pyqtSignal(object)  # 最终的BatchProgress
+
+    def __init__(self, directory, save_root, max_workers=None, repkg_path=None,
+                 group_size=REPKG_GROUP_SIZE, entry_filter=None,
+                 placement_strategy=DEFAULT_PLACEMENT_STRATEGY):
+        super().__init__()
+        self.directory = directory
+        self.save_root = save_root
+        self.options = (max_workers, repkg_path, group_size, entry_filter, placement_strategy)
+        self.extractor = None
+        self._cancelled = False
+
+    def cancel(self):
+        """请求停止（正在提取的壁纸会完成）"""
+        self._cancelled = True
+        if self.extractor is not None:
+            self.extractor.cancel()
+
+    def run(self):
+        items = []
+        try:
+            items = find_batch_items(self.directory, self.save_root)
+        except Exception as e:
+            print(f"查找壁纸失败: {e}")
+        self.extractor = BatchExtractor(items, *self.options)
+        if self._cancelled:
+            self.extractor.cancel()
+        self.itemsFound.emit(len(self.extractor.items))
+        try:
+            self.extractor.run(on_progress=self.progress.emit)
+        except Exception as e:
+            print(f"批量提取失败: {e}")
+        self.finished.emit(self.extractor.progress)
+
+
+_thumbnail_pool = None
+
+
+def get_thumbnail_pool():
+    """缩略图解码专用线程池，线程数随CPU核数增加（上限8）"""
+    global _thumbnail_pool
+    if _thumbnail_pool is None:
+        _thumbnail_pool = QThreadPool()
+        _thumbnail_pool.setMaxThreadCount(max(2, min(os.cpu_count() or 2, 8)))
+    return _thumbnail_pool
+
+
+class ImageLoadWorker(QObject):
+    """图片并行加载器
+
+    把一批缩略图拆成单独的任务分发到缩略图线程池，各任务只生成QImage，
+    QPixmap由界面线程在回调中创建（部分平台禁止在非界面线程使用QPixmap）。
+    每次加载带有一个代号(generation)，所有信号都携带该代号，
+    界面据此丢弃已被新请求取代的结果。cancel()后尚未开始的任务直接跳过。
+    """
+    imageLoaded = pyqtSignal(int, int, str, object)  # 代号、索引、路径、QImage
+    progressChanged = pyqtSignal(int, int, int)  # 代号、当前进度、总数
+    finished = pyqtSignal(int)  # 代号
+
+    def __init__(self, items, generation, cache=None, memory_cache=None, size=THUMBNAIL_SIZE):
+        super().__init__()
+        self.items = items  # (行号, 路径) 列表
+        self.generation = generation
+        self.cache = cache
+        self.memory_cache = memory_cache
+        self.size = size
+        self._cancelled = False
+        self._pending = 0
+        self._completed = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        """提交所有加载任务"""
+        pool = get_thumbnail_pool()
+        self._pending = len(self.items)
+        for index, imagePath in self.items:
+            pool.start(partial(self._load_one, index, imagePath))
+
+    def cancel(self):
+        """请求停止加载，之后不再发出任何信号"""
+        self._cancelled = True
+
+    def isRunning(self):
+        """是否还有任务未结束"""
+        return self._pending > 0
+
+    def _load_one(self, index, imagePath):
+        """在线程池中执行：解码单张缩略图"""
+        try:
+            if self._cancelled:
+                return
+            try:
+                image = load_cached_thumbnail(imagePath, self.size, self.cache, self.memory_cache)
+            except Exception as e:
+                print(f"加载缩略图失败 ({imagePath}): {e}")
+                image = None
+            if self._cancelled:
+                return
+            with self._lock:
+                self._completed += 1
+                completed = self._completed
+            self.imageLoaded.emit(self.generation, index, imagePath, image)
+            self.progressChanged.emit(self.generation, completed, len(self.items))
+            if completed == len(self.items):
+                self.finished.emit(self.generation)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+
+# 缩略图加载优先级，数值越小越先加载
+PRIORITY_VISIBLE = 0
+PRIORITY_SELECTED = 1
+PRIORITY_PREFETCH = 2
+PRIORITY_IDLE = 3
+
+
+class ThumbnailScheduler(QObject):
+    """缩略图优先级调度器
+
+    请求按优先级放入堆中，同时在途的任务数不超过线程池线程数，
+    每完成一张就从堆顶取下一张，所以可见单元格总是先于预取和空闲预热的条目解码。
+    实际加载仍由ImageLoadWorker完成；视口移动时用set_window()整体替换排队中的请求。
+    """
+    imageLoaded = pyqtSignal(int, int, str, object)  # 代号、行号、路径、QImage
 
+    def __init__(self, cache=None, memory_cache=None, max_in_flight=None):
+        super().__init__()
+        self.cache = cache
+        self.memory_cache = memory_cache
+        self.max_in_flight = max_in_flight or get_thumbnail_pool().maxThreadCount()
+        self.generation = 0
+        self._heap = []  # (优先级, 序号, 路径)
+        self._queued = {}  # 路径 -> (优先级, 行号)
+        self._in_flight = set()
+        self._loaders = []
+        self._retired = []  # 已取消但线程池任务尚未退出的加载器（信号已断开）
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._queued)
+
+    def request(self, row, path, priority):
+        """请求加载一张缩略图；已在排队时只会提升优先级"""
+        if path in self._in_flight:
+            return
+        current = self._queued.get(path)
+        if current is not None and current[0] <= priority:
+            return
+        self._queued[path] = (priority, row)
+        heapq.heappush(self._heap, (priority, next(self._counter), path))
+        self._dispatch()
+
+    def set_window(self, requests):
+        """用新的 (行号, 路径, 优先级) 列表替换排队中的请求，不在列表中的请求被丢弃"""
+        self._queued = {}
+        for row, path, priority in requests:
+            if path in self._in_flight:
+                continue
+            current = self._queued.get(path)
+            if current is None or priority < current[0]:
+                self._queued[path] = (priority, row)
+        self._heap = [(priority, next(self._counter), path)
+                      for path, (priority, _) in self._queued.items()]
+        heapq.heapify(self._heap)
+        self._dispatch()
+
+    def reset(self):
+        """丢弃所有请求，进行中的加载结果作废"""
+        self.generation += 1
+        for loader in self._loaders:
+            loader.cancel()
+            loader.imageLoaded.disconnect()
+        # 已取消的加载器保留引用，直到线程池中的任务全部退出；它们已断开，不能再次disconnect
+        self._retired = [loader for loader in self._retired + self._loaders if loader.isRunning()]
+        self._loaders = []
+        self._heap = []
+        self._queued = {}
+        self._in_flight = set()
+
+    def _dispatch(self):
+        """在有空闲名额时按优先级提交任务"""
+        items = []
+        while self._heap and len(self._in_flight) + len(items) < self.max_in_flight:
+            priority, _, path = heapq.heappop(self._heap)
+            entry = self._queued.get(path)
+            if entry is None or entry[0] != priority:
+                continue  # 已被提升优先级或移出窗口的旧条目
+            del self._queued[path]
+            items.append((entry[1], path))
+        if not items:
+            return
+        self._in_flight.update(path for _, path in items)
+
+        self._loaders = [loader for loader in self._loaders if loader.isRunning()]
+        self._retired = [loader for loader in self._retired if loader.isRunning()]
+        loader = ImageLoadWorker(items, self.generation, self.cache, self.memory_cache)
+        loader.imageLoaded.connect(self._on_image_loaded)
+        loader.start()
+        self._loaders.append(loader)
+
+    def _on_image_loaded(self, generation, row, path, image):
+        if generation != self.generation:
+            return
+        self._in_flight.discard(path)
+        self.imageLoaded.emit(generation, row, path, image)
+        self._dispatch()
+
+
+class LibraryScanWorker(QThread):
+    """壁纸库扫描工作线程，扫描结果分批推送到界面"""
+    itemsFound = pyqtSignal(list)  # 一批索引记录
+    finished = pyqtSignal()
+
+    BATCH_SIZE = 30
+    BATCH_INTERVAL = 0.1  # 秒，扫描较慢时也定期推送已找到的条目
+
+    def __init__(self, library_index, workshop_dir):
+        super().__init__()
+        self.library_index = library_index
+        self.workshop_dir = workshop_dir
+        self._cancelled = False
+
+    def cancel(self):
+        """请求停止扫描（已推送的条目不受影响）"""
+        self._cancelled = True
+
+    def run(self):
+        batch = []
+        last_emit = time.monotonic()
+        scan = self.library_index.iter_scan(self.workshop_dir)
+        try:
+            for record in scan:
+                if self._cancelled:
+                    break
+                batch.append(record)
+                now = time.monotonic()
+                if len(batch) >= self.BATCH_SIZE or now - last_emit >= self.BATCH_INTERVAL:
+                    self.itemsFound.emit(batch)
+                    batch = []
+                    last_emit = now
+            if batch and not self._cancelled:
+                self.itemsFound.emit(batch)
+        except Exception as e:
+            print(f"扫描创意工坊目录失败: {e}")
+        finally:
+            scan.close()
         self.finished.emit()
 
 
+class MetadataLoadWorker(QThread):
+    """在后台把所有壁纸的元数据放入共享元数据缓存
+
+    壁纸库索引的记录中已保存解析结果和当时project.json的修改时间、大小，直接放入缓存；
+    只有记录中没有的壁纸才读取project.json。
+    """
+
+    CHUNK_SIZE = 256
+
+    def __init__(self, records):
+        super().__init__()
+        self.records = records
+        self._cancelled = False
+
+    def cancel(self):
+        """请求停止加载（已加载的条目保留在缓存中）"""
+        self._cancelled = True
+
+    def run(self):
+        cache = get_metadata_cache()
+        missing = []
+        for record in self.records:
+            known = record_metadata(record)
+            if known is None:
+                missing.append(record["path"])
+            else:
+                cache.seed(record["path"], *known)
+        for start in range(0, len(missing), self.CHUNK_SIZE):
+            if self._cancelled:
+                break
+            cache.load_many(missing[start:start + self.CHUNK_SIZE])
+
+
 class SearchIndexWorker(QThread):
-    """异步创建搜索索引的工作线程"""
-    indexBuilt = pyqtSignal(list)
+    """异步创建搜索、分面筛选和排序索引的工作线程"""
+    indexBuilt = pyqtSignal(object, object, object)  # SearchIndex、FacetIndex、SortIndex
 
-    def __init__(self, image_paths):
+    def __init__(self, library_items):
         super().__init__()
-        self.image_paths = image_paths
+        self.library_items = library_items
 
     def run(self):
-        index = []
-        for image_path in self.image_paths:
-            title = ""
-            pj = os.path.join(os.path.dirname(image_path), "project.json")
-            if os.path.exists(pj):
-                try:
-                    with open(pj, "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                        title = data.get("title", "")
-                except Exception:
-                    pass
-            index.append({"title": title.lower(), "path": image_path})
-        self.indexBuilt.emit(index)
+        # 各字段已由壁纸库索引读取，这里不再重复解析project.json
+        items = [item for item in self.library_items if item["preview"]]
+        index = SearchIndex((item["preview"], item) for item in items)
+        self.indexBuilt.emit(index, FacetIndex(items), SortIndex(items))
+
+
+class SearchQueryWorker(QThread):
+    """在后台执行一次搜索查询，结果带有序号，界面据此丢弃过期的结果"""
+    resultsReady = pyqtSignal(int, list)  # 序号、匹配的预览图路径
+
+    def __init__(self, search_index, query, serial):
+        super().__init__()
+        self.search_index = search_index
+        self.query = query
+        self.serial = serial
+
+    def run(self):
+        try:
+            results = self.search_index.search(self.query)
+        except Exception as e:
+            print(f"搜索失败: {e}")
+            results = []
+        self.resultsReady.emit(self.serial, results)